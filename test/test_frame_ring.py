@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# frame_ring.py is a script module of the package (it imports image_msg like the nodes do)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "wolfwagen"))
+
+from frame_ring import FrameRing, ring_name  # noqa: E402
+
+HEIGHT, WIDTH, CHANNELS = 4, 6, 4
+STEP = WIDTH * CHANNELS
+
+
+def frame(value):
+    return np.full((HEIGHT, WIDTH, CHANNELS), value, np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(ring_name("/test_%d/image" % os.getpid()), HEIGHT*STEP, "bgra8", slots=2)
+    yield ring
+    ring.close()
+
+
+def test_ring_name():
+    assert ring_name("/zed2i/zed_node/rgb_raw/image_raw_color") == "wolfwagen_zed2i_zed_node_rgb_raw_image_raw_color"
+
+
+def test_write_and_read(ring):
+    index = ring.write(7, frame(7).tobytes())
+    assert index == 7 % ring.slots
+    assert ring.valid(index, 7)
+    assert np.array_equal(ring.image(index, HEIGHT, WIDTH, STEP), frame(7))
+
+
+def test_reader_sees_the_frames_of_the_writer(ring):
+    reader = FrameRing.attach(ring.shm.name)
+    try:
+        assert (reader.slots, reader.slot_size, reader.encoding) == (2, HEIGHT*STEP, "bgra8")
+        index = ring.write(1, frame(1).tobytes())
+        image = reader.image(index, HEIGHT, WIDTH, STEP)
+        assert reader.valid(index, 1) and np.array_equal(image, frame(1))
+        del image
+    finally:
+        reader.close()
+    # closing a reader leaves the block to the writer
+    reader = FrameRing.attach(ring.shm.name)
+    assert reader.valid(index, 1)
+    reader.close()
+
+
+def test_overwritten_frame_is_not_valid(ring):
+    index = ring.write(1, frame(1).tobytes())
+    assert ring.write(3, frame(3).tobytes()) == index
+    assert not ring.valid(index, 1)
+    assert ring.valid(index, 3)
+
+
+def test_bad_frames(ring):
+    with pytest.raises(ValueError):
+        ring.write(1, bytes(HEIGHT*STEP + 1))
+    with pytest.raises(ValueError):
+        FrameRing.create(ring_name("/test_%d/small" % os.getpid()), 16, "bgra8", slots=1)
+
+
+def test_closed_ring(ring):
+    index = ring.write(1, frame(1).tobytes())
+    reader = FrameRing.attach(ring.shm.name)
+    reader.close()
+    assert not reader.valid(index, 1)
+    assert reader.slot(index) is None
+    assert reader.image(index, HEIGHT, WIDTH, STEP) is None
+
+
+def test_stale_block_is_replaced(ring):
+    # a writer that did not exit cleanly left its block behind
+    name = ring.shm.name
+    ring.write(1, frame(1).tobytes())
+    new = FrameRing.create(name, HEIGHT*STEP, "bgra8", slots=3)
+    try:
+        assert new.slots == 3 and not new.valid(1, 1)
+    finally:
+        new.close()
+    ring.owner = False      # the block was unlinked with the new ring
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from wolfwagen.lane_detection.edges import GammaNormalizer, adjust_gamma, gamma_table
+from wolfwagen.lane_detection.stage_timer import StageTimer
+
+TIMER = StageTimer(False)
+
+
+@pytest.mark.parametrize("gamma", [0.4, 1.0, 1.5, 2.5])
+def test_table_matches_the_per_entry_version(gamma):
+    # the table of the original adjust_gamma
+    expected = np.array([((i / 255.0) ** (1.0 / gamma)) * 255 for i in np.arange(0, 256)]).astype("uint8")
+    table = gamma_table(gamma)
+    assert table.dtype == np.uint8 and table.shape == (256,)
+    assert np.array_equal(table, expected)
+
+
+def test_table_is_cached():
+    assert gamma_table(1.7) is gamma_table(1.7)
+
+
+def test_adjust_gamma():
+    image = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert np.array_equal(adjust_gamma(image, 1.0), image)
+    brighter = adjust_gamma(image, 2.0)
+    assert np.all(brighter >= image) and brighter[8, 0] > image[8, 0]
+
+
+def test_normalizer_brings_the_median_to_the_target():
+    dark = np.full((64, 64), 40, np.uint8)
+    normalizer = GammaNormalizer(target=100, sample=1)
+    normalized = normalizer.normalize(dark, TIMER)
+    assert normalizer.gamma > 1.0
+    assert int(np.median(normalized)) == pytest.approx(100, abs=5)
+
+
+def test_normalizer_picks_the_gamma_every_few_frames():
+    normalizer = GammaNormalizer(every=3, sample=1)
+    normalizer.normalize(np.full((8, 8), 40, np.uint8), TIMER)
+    gamma = normalizer.gamma
+    for _ in range(2):
+        normalizer.normalize(np.full((8, 8), 200, np.uint8), TIMER)
+        assert normalizer.gamma == gamma
+    normalizer.normalize(np.full((8, 8), 200, np.uint8), TIMER)
+    assert normalizer.gamma < 1.0
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from wolfwagen.lane_detection.intersection import (
+    LEFT, RIGHT, FrontBox, IntegralIntersection, IntersectionEvent, RandomChooser)
+
+# edge images of the full resolution stereo ROI (see roi.StereoRoi)
+HEIGHT, WIDTH = 359, 1280
+
+
+def edge_image(left_open, right_open, scale=1):
+    edge = np.zeros((HEIGHT // scale, WIDTH // scale), np.uint8)
+    if not left_open:
+        edge[200 // scale:, :300 // scale] = 255
+    if not right_open:
+        edge[200 // scale:, 900 // scale:] = 255
+    return edge
+
+
+LEFT_OPEN = edge_image(True, False)
+CLOSED = edge_image(False, False)
+FRAME = np.zeros((720, 2560, 4), np.uint8)
+
+
+def feed(check, edges, start):
+    # one frame every 0.1 s from 'start', returns the events (None: no event)
+    return [check.check(FRAME, edge, start + 0.1*i) for i, edge in enumerate(edges)]
+
+
+def test_no_check_during_cooldown():
+    check = IntegralIntersection(RandomChooser(), cooldown=3.0)
+    assert feed(check, [LEFT_OPEN] * 30, 0.0) == [None] * 30
+
+
+def test_event_after_enter_frames():
+    check = IntegralIntersection(RandomChooser(), enter_frames=3, cooldown=3.0)
+    check.check(FRAME, CLOSED, 0.0)     # starts the cooldown
+    events = feed(check, [LEFT_OPEN] * 3, 3.5)
+    assert events[:2] == [None, None]
+    event = events[2]
+    assert event.direction == LEFT
+    assert (event.front, event.left, event.right) == (False, True, False)
+    assert event.frames == 3
+    assert event.time == pytest.approx(3.7)
+
+
+def test_closed_frame_restarts_the_count():
+    check = IntegralIntersection(RandomChooser(), enter_frames=3, cooldown=3.0)
+    check.check(FRAME, CLOSED, 0.0)
+    events = feed(check, [LEFT_OPEN, LEFT_OPEN, CLOSED, LEFT_OPEN, LEFT_OPEN], 3.5)
+    assert events == [None] * 5
+    assert check.check(FRAME, LEFT_OPEN, 4.0).direction == LEFT
+
+
+def test_rearms_after_exit_frames():
+    check = IntegralIntersection(RandomChooser(), enter_frames=3, exit_frames=3, cooldown=3.0)
+    check.check(FRAME, CLOSED, 0.0)
+    assert feed(check, [LEFT_OPEN] * 3, 3.5)[-1] is not None
+
+    # after the cooldown, still at the same intersection: not armed
+    assert feed(check, [LEFT_OPEN] * 10, 7.0) == [None] * 10
+    # two closed frames are not enough to re-arm
+    assert feed(check, [CLOSED, CLOSED] + [LEFT_OPEN] * 5, 8.0) == [None] * 7
+    # three are
+    events = feed(check, [CLOSED] * 3 + [LEFT_OPEN] * 3, 9.0)
+    assert events[:5] == [None] * 5
+    assert events[5].direction == LEFT
+
+
+def test_threshold_is_absolute_and_scaled():
+    check = IntegralIntersection(RandomChooser(), enter_frames=1, cooldown=0.0)
+    check.check(FRAME, CLOSED, 0.0)
+
+    # full resolution: 3 edge pixels in the left corner (765 < 1000) are open, 4 (1020) are not
+    edge = edge_image(True, False)
+    edge[300, 10:13] = 255
+    assert check.check(FRAME, edge, 1.0).direction == LEFT
+    check.armed = True
+    edge[300, 13] = 255
+    assert check.check(FRAME, edge, 2.0) is None
+
+    # half resolution: the threshold is halved (1 pixel is open, 2 are not)
+    check.armed = True
+    edge = edge_image(True, False, scale=2)
+    edge[150, 10] = 255
+    assert check.check(FRAME, edge, 3.0, scale=2).direction == LEFT
+    check.armed = True
+    edge[150, 11] = 255
+    assert check.check(FRAME, edge, 4.0, scale=2) is None
+
+
+def test_front_box():
+    box = FrontBox(1/3, 2/3, 0.5, 200, 1000)
+    frame = np.zeros((720, 2560, 4), np.uint8)
+    assert box.is_open(frame)
+    # a white line in the box: columns 1080..1280 of the image without the middle half are 2360..2560
+    frame[300:320, 2400:2500] = 255
+    assert not box.is_open(frame)
+    # the same line left of the box does not count
+    frame[:] = 0
+    frame[300:320, 2200:2300] = 255
+    assert box.is_open(frame)
+
+
+def test_event_msg_round_trip():
+    pytest.importorskip("diagnostic_msgs")
+    event = IntersectionEvent(RIGHT, True, False, True, 12.5, 3)
+    msg = event.to_msg()
+    assert msg.name == 'intersection'
+    assert msg.message == 'right'
+    back = IntersectionEvent.from_msg(msg)
+    assert (back.direction, back.front, back.left, back.right) == (RIGHT, True, False, True)
+    assert (back.time, back.frames) == (12.5, 3)
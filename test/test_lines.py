@@ -0,0 +1,132 @@
+import math
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from wolfwagen.lane_detection.lines import HoughLineExtractor, SlidingWindowExtractor, get_end_points
+from wolfwagen.lane_detection.stage_timer import StageTimer
+
+# edge images of the full resolution stereo ROI (see roi.StereoRoi)
+HEIGHT, WIDTH = 359, 1280
+TIMER = StageTimer(False)
+
+
+def lane_image(left=None, right=None):
+    # edge image with the given markings, (x at the bottom, x at the top) each
+    edge = np.zeros((HEIGHT, WIDTH), np.uint8)
+    for marking in (left, right):
+        if marking is not None:
+            cv.line(edge, (marking[0], HEIGHT - 1), (marking[1], 0), 255, 3)
+    return edge
+
+
+def baseline_lanes(edge, threshold=150, slope_threshold=0.2, missing_cte=500):
+    # the per-line loop of the original LaneDetectionV6.process_img: (CTE, left, right)
+    lines = cv.HoughLines(edge, 1, np.pi/180, threshold, None, 0, 0)
+    if lines is None:
+        return 0, None, None
+    xs = {True: [], False: []}
+    ys = {True: [], False: []}
+    for line in lines:
+        rho, theta = line[0][0], line[0][1]
+        a, b = math.cos(theta), math.sin(theta)
+        x1, y1 = int(a*rho + 1000*(-b)), int(b*rho + 1000*a)
+        x2, y2 = int(a*rho - 1000*(-b)), int(b*rho - 1000*a)
+        if x2 - x1 == 0:
+            continue
+        slope = (y2 - y1) / float(x2 - x1)
+        if abs(slope) < slope_threshold:
+            continue
+        xs[slope <= 0].extend([x1, x2])
+        ys[slope <= 0].extend([y1, y2])
+
+    fitted = {}
+    for side in (True, False):
+        if xs[side]:
+            poly = np.poly1d(np.polyfit(ys[side], xs[side], deg=1))
+            fitted[side] = (int(poly(edge.shape[0])), int(poly(0)))
+    left, right = fitted.get(True), fitted.get(False)
+    if left is not None and right is not None:
+        return int(edge.shape[1]/2) - (right[0] + left[0])/2, left, right
+    if left is None and right is None:
+        return 0, None, None
+    return (missing_cte if left is None else -missing_cte), left, right
+
+
+def test_end_points_match_the_scalar_version():
+    rng = np.random.default_rng(0)
+    rho = rng.uniform(-1500, 1500, 200).astype(np.float32)
+    theta = rng.uniform(0, np.pi, 200).astype(np.float32)
+    x1, y1, x2, y2 = get_end_points(rho, theta)
+    for i in range(len(rho)):
+        a, b = math.cos(theta[i]), math.sin(theta[i])
+        x0, y0 = a*rho[i], b*rho[i]
+        assert (x1[i], y1[i], x2[i], y2[i]) == (int(x0 + 1000*(-b)), int(y0 + 1000*a),
+                                                int(x0 - 1000*(-b)), int(y0 - 1000*a))
+
+
+@pytest.mark.parametrize("left, right", [
+    ((200, 500), (1100, 800)),      # both markings
+    ((350, 560), (1200, 760)),      # off center
+    ((200, 500), None),             # only the left marking
+    (None, (1100, 800)),            # only the right marking
+    (None, None),                   # no lines
+])
+def test_same_cte_as_the_baseline(left, right):
+    edge = lane_image(left, right)
+    lanes = HoughLineExtractor().extract(None, edge, TIMER)
+    cte, baseline_left, baseline_right = baseline_lanes(edge)
+    assert (lanes.left, lanes.right) == (baseline_left, baseline_right)
+    assert (lanes.left is None, lanes.right is None) == (left is None, right is None)
+    assert lanes.cte == pytest.approx(cte)
+    if left is not None and right is not None:
+        # the fitted markings are where they were drawn
+        assert lanes.left[0] == pytest.approx(left[0], abs=10)
+        assert lanes.right[0] == pytest.approx(right[0], abs=10)
+
+
+def binary_image(left=None, right=None, width=8):
+    # thresholded ROI with the given markings, (x at the bottom, x at the top) each
+    binary = np.zeros((HEIGHT, WIDTH), np.uint8)
+    for marking in (left, right):
+        if marking is not None:
+            cv.line(binary, (marking[0], HEIGHT - 1), (marking[1], 0), 255, width)
+    return binary
+
+
+def test_sliding_windows_follow_the_markings():
+    binary = binary_image((200, 500), (1100, 800))
+    lanes = SlidingWindowExtractor().extract(binary, None, TIMER)
+    assert lanes.left[0] == pytest.approx(200, abs=5) and lanes.left[1] == pytest.approx(500, abs=5)
+    assert lanes.right[0] == pytest.approx(1100, abs=5) and lanes.right[1] == pytest.approx(800, abs=5)
+    assert lanes.cte == pytest.approx(WIDTH//2 - (lanes.left[0] + lanes.right[0])/2)
+    # the path of the windows: one segment between every two windows of each side
+    assert lanes.segments.shape == (2*8, 4)
+
+
+def test_sliding_windows_missing_marking():
+    extractor = SlidingWindowExtractor(missing_cte=500)
+    lanes = extractor.extract(binary_image((200, 500), None), None, TIMER)
+    assert lanes.right is None and lanes.cte == -500
+    lanes = extractor.extract(binary_image(None, (1100, 800)), None, TIMER)
+    assert lanes.left is None and lanes.cte == 500
+    lanes = extractor.extract(binary_image(), None, TIMER)
+    assert lanes.left is None and lanes.right is None and lanes.cte == 0
+
+
+def test_sliding_windows_ignore_noise():
+    # a few scattered pixels are below min_peak / min_pixels
+    binary = binary_image(None, (1100, 800))
+    binary[300:303, 100:103] = 255
+    lanes = SlidingWindowExtractor().extract(binary, None, TIMER)
+    assert lanes.left is None and lanes.right is not None
+
+
+def test_sliding_windows_one_side():
+    binary = binary_image(None, (1100, 800))[:, WIDTH//2:]
+    marking, segments = SlidingWindowExtractor().extract_side(binary, None, "right")
+    assert marking[0] == pytest.approx(1100 - WIDTH//2, abs=5)
+    assert len(segments) == 8
+    marking, segments = SlidingWindowExtractor().extract_side(np.zeros_like(binary), None, "right")
+    assert marking is None and len(segments) == 0
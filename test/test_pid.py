@@ -0,0 +1,76 @@
+import pytest
+
+from wolfwagen.pid import PID
+
+
+def integrator(**kwargs):
+    # output == integral of the error
+    return PID(0.0, 1.0, **kwargs)
+
+
+def test_default_dt_for_the_first_update():
+    pid = integrator(default_dt=0.05)
+    assert pid.update(1.0, 10.0) == pytest.approx(0.05)
+    assert pid.update(1.0, 10.2) == pytest.approx(0.25)
+
+
+def test_default_dt_without_stamps():
+    pid = integrator(default_dt=0.1)
+    for i in range(1, 4):
+        assert pid.update(1.0) == pytest.approx(0.1 * i)
+
+
+def test_repeated_and_out_of_order_stamps():
+    pid = integrator(default_dt=0.05)
+    pid.update(1.0, 10.0)                                   # 0.05
+    assert pid.update(1.0, 10.0) == pytest.approx(0.10)     # same stamp: default_dt
+    assert pid.update(1.0, 9.9) == pytest.approx(0.15)      # older stamp: default_dt
+    # dt is measured from the last stamp, even if it went back
+    assert pid.update(1.0, 10.1) == pytest.approx(0.35)
+
+
+def test_max_dt():
+    pid = integrator(default_dt=0.05, max_dt=0.5)
+    pid.update(1.0, 0.0)
+    assert pid.update(1.0, 5.0) == pytest.approx(0.55)
+
+
+def test_anti_windup():
+    pid = integrator(output_limits=(-1.0, 1.0), default_dt=0.1)
+    for _ in range(30):
+        assert pid.update(1.0) <= 1.0
+    # the integral stopped growing at the limit of the output
+    assert pid.integral == pytest.approx(1.0)
+    # so the output leaves the limit as soon as the error changes sign
+    assert pid.update(-1.0) == pytest.approx(0.9)
+
+
+def test_integral_limits():
+    pid = integrator(integral_limits=(-0.3, 0.3), default_dt=0.1)
+    for _ in range(10):
+        pid.update(-1.0)
+    assert pid.integral == pytest.approx(-0.3)
+    assert pid.update(1.0) == pytest.approx(-0.2)
+
+
+def test_no_derivative_kick_on_the_first_update():
+    pid = PID(0.0, 0.0, 1.0, default_dt=0.1)
+    assert pid.update(5.0, 1.0) == 0.0
+    assert pid.update(6.0, 1.5) == pytest.approx(2.0)
+
+
+def test_reset():
+    pid = PID(1.0, 1.0, 1.0, default_dt=0.1)
+    pid.update(1.0, 1.0)
+    pid.update(3.0, 1.2)
+    pid.reset()
+    assert (pid.integral, pid.derivative, pid.prev_error, pid.prev_stamp) == (0.0, 0.0, None, None)
+    # like a new controller: default_dt and no derivative, whatever the stamps before the reset
+    assert pid.update(2.0, 5.0) == pytest.approx(2.0 + 0.2)
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        PID(1.0, default_dt=0.0)
+    with pytest.raises(ValueError):
+        PID(1.0, derivative_tau=-1.0)
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+from wolfwagen.teensy_link import TeensyLink, crc8, decode_frame, encode_frame
+
+
+class FakePort:
+    # Serial port that keeps the decoded frames. While 'gate' is cleared, write() blocks (a slow serial port)
+
+    def __init__(self):
+        self.frames = []
+        self.written = threading.Condition()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write(self, data):
+        self.gate.wait()
+        with self.written:
+            self.frames.append(decode_frame(data))
+            self.written.notify_all()
+
+    def wait_for(self, count, timeout=2.0):
+        with self.written:
+            assert self.written.wait_for(lambda: len(self.frames) >= count, timeout)
+            return list(self.frames)
+
+
+@pytest.fixture
+def port():
+    return FakePort()
+
+
+@pytest.fixture
+def link(port):
+    link = TeensyLink(port, heartbeat=10.0)
+    yield link
+    port.gate.set()
+    link.close()
+
+
+def test_crc8_check_value():
+    # CRC-8 (polynomial 0x07, initial value 0, no reflection, no final xor)
+    assert crc8(b"123456789") == 0xF4
+    assert crc8(b"") == 0
+
+
+def test_frame_round_trip():
+    frame = encode_frame(7, 1500, 90)
+    assert len(frame) == 7
+    assert frame[:2] == b"\xA5\x5A"
+    assert decode_frame(frame) == (7, 1500, 90)
+    # the sequence number wraps around
+    assert decode_frame(encode_frame(256 + 3, 1600, 0))[0] == 3
+
+
+def test_corrupted_frames():
+    frame = bytearray(encode_frame(1, 1500, 90))
+    frame[3] ^= 0x01
+    assert decode_frame(bytes(frame)) is None
+    assert decode_frame(encode_frame(1, 1500, 90)[:-1]) is None
+    assert decode_frame(b"\x00\x00" + encode_frame(1, 1500, 90)[2:]) is None
+
+
+def test_out_of_range():
+    with pytest.raises(ValueError):
+        encode_frame(1, 1500, 181)
+    with pytest.raises(ValueError):
+        encode_frame(1, -1, 90)
+
+
+def test_send(port, link):
+    link.send(1500, 90)
+    assert port.wait_for(1) == [(1, 1500, 90)]
+    link.send(1550, 80)
+    assert port.wait_for(2)[1] == (2, 1550, 80)
+
+
+def test_latest_command_wins(port, link):
+    port.gate.clear()
+    link.send(1500, 90)
+    time.sleep(0.05)        # the writer is blocked in write() with the first command
+    for steering in range(60, 70):
+        link.send(1500, steering)
+    port.gate.set()
+
+    frames = port.wait_for(2)
+    time.sleep(0.05)
+    # only the last of the commands sent while the port was busy is written
+    assert port.frames == frames
+    assert [steering for _, _, steering in frames] == [90, 69]
+
+
+def test_same_command_is_not_written_again(port, link):
+    link.send(1500, 90)
+    port.wait_for(1)
+    link.send(1500, 90)
+    time.sleep(0.1)
+    assert len(port.frames) == 1
+
+
+def test_heartbeat(port):
+    link = TeensyLink(port, heartbeat=0.05)
+    try:
+        link.send(1500, 90)
+        frames = port.wait_for(4)
+    finally:
+        link.close()
+    # the last command is written again while nothing new is sent
+    assert {(throttle, steering) for _, throttle, steering in frames} == {(1500, 90)}
+    assert [seq for seq, _, _ in frames[:4]] == [1, 2, 3, 4]
+
+
+def test_write_errors_are_counted():
+    class BrokenPort:
+        def write(self, data):
+            raise OSError("unplugged")
+
+    link = TeensyLink(BrokenPort(), heartbeat=0.02)
+    try:
+        link.send(1500, 90)
+        deadline = time.monotonic() + 2.0
+        while link.errors < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        link.close()
+    assert link.errors >= 2
+    assert link.frames == 0
+
+
+def test_trace_of_written_command(port, link):
+    port.gate.clear()
+    first = {'stamp': 1}
+    link.send(1500, 90, first)
+    time.sleep(0.05)        # the writer is blocked in write() with the first command
+    before = time.time_ns()
+    link.send(1500, 80, {'stamp': 2})       # replaced before it is written: no trace
+    link.send(1500, 70, {'stamp': 3})
+    link.send(1500, 70, {'stamp': 4})       # unchanged: no trace
+    port.gate.set()
+    port.wait_for(2)
+    time.sleep(0.05)
+
+    traces = list(link.written)
+    assert [t['stamp'] for t in traces] == [1, 3]
+    assert traces[0] is first
+    assert traces[1]['written'] >= before
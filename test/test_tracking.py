@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from wolfwagen.lane_detection.lines import LaneLines
+from wolfwagen.lane_detection.stage_timer import StageTimer
+from wolfwagen.lane_detection.tracking import LaneTracker
+
+HEIGHT, WIDTH = 359, 1280
+IMAGE = np.full((HEIGHT, WIDTH), 255, np.uint8)
+TIMER = StageTimer(False)
+
+
+class ScriptedLines:
+    # line extractor returning the given (left, right) markings, one pair per frame, and keeping the edge images
+    # it was given
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.edges = []
+
+    def extract(self, binary, edge, timer):
+        self.edges.append(edge)
+        left, right = self.frames.pop(0)
+        return LaneLines(0, None, left, right, height=HEIGHT, center=WIDTH//2)
+
+
+def run(tracker, count):
+    return [tracker.extract(IMAGE, IMAGE, TIMER) for _ in range(count)]
+
+
+def test_measurements_are_filtered():
+    lines = ScriptedLines([((200, 500), (1100, 800))] * 5 + [((230, 500), (1100, 800))])
+    tracker = LaneTracker(lines)
+    lanes = run(tracker, 6)
+    assert lanes[0].left == (200, 500)
+    assert lanes[4].cte == pytest.approx(WIDTH//2 - (200 + 1100)/2, abs=1)
+    # a jump of the measurement only moves the tracked marking part of the way
+    assert 200 < lanes[5].left[0] < 230
+
+
+def test_outliers_are_gated():
+    lines = ScriptedLines([((200, 500), (1100, 800))] * 3 + [((400, 500), (1100, 800))])
+    lanes = run(LaneTracker(lines, gate=80), 4)
+    assert lanes[3].left[0] == pytest.approx(200, abs=2)
+
+
+def test_missing_marking_is_predicted_then_dropped():
+    lines = ScriptedLines([((200, 500), (1100, 800))] * 2 + [(None, (1100, 800))] * 3)
+    lanes = run(LaneTracker(lines, max_misses=2, missing_cte=500), 5)
+    # the predicted line is used for max_misses frames: no jump of the CTE to missing_cte
+    assert lanes[2].left == lanes[3].left == (200, 500)
+    assert lanes[3].cte == pytest.approx(lanes[1].cte, abs=1)
+    assert lanes[4].left is None and lanes[4].cte == 500
+
+
+def test_search_band():
+    lines = ScriptedLines([((200, 500), (1100, 800))] * 2)
+    run(LaneTracker(lines, band=40), 2)
+    # the first frame is searched everywhere, the next only around the tracked markings
+    assert np.count_nonzero(lines.edges[0]) == HEIGHT * WIDTH
+    band = lines.edges[1]
+    assert band[HEIGHT - 1, 200] == 255 and band[0, 500] == 255 and band[0, 800] == 255
+    assert band[HEIGHT - 1, 200 + 60] == 0 and band[HEIGHT//2, WIDTH//2] == 0
+
+
+def test_reset():
+    lines = ScriptedLines([((200, 500), (1100, 800)), ((400, 600), (1100, 800))])
+    tracker = LaneTracker(lines)
+    run(tracker, 1)
+    tracker.reset()
+    # after a reset the next measurement is taken as it is (not gated)
+    assert run(tracker, 1)[0].left == (400, 600)
@@ -0,0 +1,53 @@
+import pytest
+
+from wolfwagen.lane_detection.intersection import LEFT, RIGHT, STRAIGHT
+from wolfwagen.lane_detection.turning import TURN_COMMANDS, TurnController
+
+
+@pytest.fixture
+def published():
+    return []
+
+
+@pytest.fixture
+def turn(published):
+    return TurnController(published.append, tolerance=10.0, timeout=2.0, end_command=0)
+
+
+def test_start_publishes_the_turn_command(turn, published):
+    turn.start(LEFT, 350.0, 0.0)
+    assert published == [TURN_COMMANDS[LEFT]]
+    assert turn.active()
+    assert turn.target == pytest.approx(80.0)
+
+
+def test_hold_publishes_again_until_the_end(turn, published):
+    turn.start(RIGHT, 180.0, 0.0)
+    assert turn.hold()
+    assert not turn.update(150.0, 0.5)
+    assert turn.update(95.0, 1.0)       # within 10 degrees of 90
+    assert not turn.hold()
+    assert published == [TURN_COMMANDS[RIGHT], TURN_COMMANDS[RIGHT], 0]
+
+
+def test_end_command_on_timeout(turn, published):
+    turn.start(LEFT, 0.0, 0.0)
+    assert not turn.update(10.0, 1.9)
+    assert turn.update(10.0, 2.1)
+    assert not turn.active()
+    assert published == [TURN_COMMANDS[LEFT], 0]
+    # ended once
+    assert not turn.update(10.0, 2.2)
+    assert published == [TURN_COMMANDS[LEFT], 0]
+
+
+def test_straight_ends_after_its_start_command(turn, published):
+    # the yaw is already on target, the next pose ends the turn: the end command comes last
+    turn.start(STRAIGHT, 42.0, 0.0)
+    assert turn.update(42.0, 0.01)
+    assert published == [TURN_COMMANDS[STRAIGHT], 0]
+
+
+def test_unknown_direction(turn):
+    with pytest.raises(ValueError):
+        turn.start(7, 0.0, 0.0)
@@ -1,34 +1,97 @@
 #include <Servo.h>
 
-int message;
+// Commands from pwm_genV3.5.py (see teensy_link.py), 7-byte frames:
+//   0xA5 0x5A | seq | throttle (uint16, little endian, microseconds) | steering (degrees) | CRC-8 (poly 0x07)
+// A frame with a wrong CRC is dropped and the parser waits for the next sync bytes.
+// Without a valid frame for FAILSAFE_TIMEOUT ms (the host sends one at least every 100 ms), the throttle goes to neutral.
+
+const uint8_t SYNC1 = 0xA5;
+const uint8_t SYNC2 = 0x5A;
+const int PAYLOAD_SIZE = 4;     // seq, throttle (2), steering
+
+const unsigned long FAILSAFE_TIMEOUT = 300;   // ms
+const int NEUTRAL_THROTTLE = 1500;            // us
 
 Servo myServo , myDC;
 
-int list[2];
+// parser state: 0 = waiting for SYNC1, 1 = waiting for SYNC2, 2 = reading the payload and the CRC
+int state = 0;
+uint8_t frame[PAYLOAD_SIZE + 1];
+int received = 0;
+
+uint8_t lastSeq = 0;
+unsigned long missedFrames = 0;
+unsigned long badFrames = 0;
+unsigned long lastFrameTime = 0;
+bool failsafe = true;
+
+uint8_t crc8(const uint8_t *data, int len) {
+  uint8_t crc = 0;
+  for (int i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+void applyFrame() {
+  uint8_t seq = frame[0];
+  int throttle = frame[1] | (frame[2] << 8);
+  int steering = frame[3];
+
+  missedFrames += (uint8_t)(seq - lastSeq - 1);
+  lastSeq = seq;
+  lastFrameTime = millis();
+  failsafe = false;
+
+  myDC.writeMicroseconds(throttle);
+  myServo.write(steering);
+}
 
 void setup() {
   // put your setup code here, to run once:
   // Setting rate for serial
-  Serial.begin(9600);
+  Serial.begin(115200);
   // Wait for serial to get ready
   while(!Serial);
 
   myServo.attach(18);
-  
+
   myDC.attach(19);
+  myDC.writeMicroseconds(NEUTRAL_THROTTLE);
 
 }
 
 void loop() {
-  if (Serial.available()>0){
-    for (int i = 0; i < 2; i++){
-      list[i] = Serial.read();
+  while (Serial.available() > 0) {
+    uint8_t b = Serial.read();
+    if (state == 0) {
+      if (b == SYNC1) state = 1;
+    } else if (state == 1) {
+      if (b == SYNC2) {
+        state = 2;
+        received = 0;
+      } else if (b != SYNC1) {
+        state = 0;
+      }
+    } else {
+      frame[received++] = b;
+      if (received == PAYLOAD_SIZE + 1) {
+        if (crc8(frame, PAYLOAD_SIZE) == frame[PAYLOAD_SIZE]) {
+          applyFrame();
+        } else {
+          badFrames++;
+        }
+        state = 0;
+      }
     }
-    int throttle = list[0];
-    int steering = list[1];
+  }
 
-    myDC.writeMicroseconds(10 * throttle);
-    myServo.write(steering);
-    
+  if (!failsafe && millis() - lastFrameTime > FAILSAFE_TIMEOUT) {
+    // host or link gone: stop driving, keep the last steering
+    myDC.writeMicroseconds(NEUTRAL_THROTTLE);
+    failsafe = true;
   }
-}
\ No newline at end of file
+}
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# The wolfwagen Python nodes in one process, on one executor (see wolfwagen.launch.py for the whole stack).
+#
+#   ./composition.py                                   # lane detection (V6), stop sign, obstacle detector,
+#                                                      # xbox controller
+#   ./composition.py --profile V7 --nodes lane obstacle
+#   ./composition.py --ros-args -p tracking:=true      # ROS parameters go to the nodes as usual
+#
+# Each node class does its ROS setup in __init__ and has its main loop in run(), which runs on its own thread here
+# (the scripts run the same class on its own: ./LaneDetectionV6.py, ./obstacle_detector.py, ...).
+# The camera images are received once per topic by the FrameHub and handed to every node of the process that
+# uses that topic (the same message object, not one deserialized copy per node). With --shared-frames they are
+# read from the shared memory of frame_hub.py instead (when camera nodes of other processes use the hub too).
+import argparse
+import logging
+import sys
+import threading
+
+import rclpy
+from rclpy.executors import MultiThreadedExecutor
+from rclpy.node import Node
+from rclpy.utilities import remove_ros_args
+from sensor_msgs.msg import Image
+
+from frame_hub import SharedFrames
+from node_log import setup_logging
+from qos import SENSOR
+
+log = logging.getLogger("wolfwagen")
+
+NODES = ['lane', 'stop_sign', 'obstacle', 'xbox']
+
+
+class FrameHub(Node):
+    # One camera subscription per topic for all the nodes of the process. subscribe(topic, callback): callback(msg)
+    # is called with every image of the topic. The callbacks share the message, so they must not modify its data
+
+    def __init__(self):
+        super().__init__("frame_fanout")
+        self.callbacks = {}     # topic -> callbacks
+
+    def subscribe(self, topic, callback):
+        if topic not in self.callbacks:
+            self.callbacks[topic] = []
+            self.create_subscription(Image, topic, lambda msg: self.dispatch(topic, msg), SENSOR)
+        self.callbacks[topic].append(callback)
+
+    def dispatch(self, topic, msg):
+        for callback in self.callbacks[topic]:
+            callback(msg)
+
+
+def create_nodes(names, profile, frames):
+    # the modules are only imported when their node is used (the stop sign node loads TensorFlow)
+    nodes = []
+    if 'lane' in names:
+        from lane_detection_node import LaneDetectionNode
+        nodes.append(LaneDetectionNode(profile, frames=frames))
+    if 'stop_sign' in names:
+        from stop_sign_detection.stop_sign_detect_node import StopSignNode
+        nodes.append(StopSignNode(frames=frames))
+    if 'obstacle' in names:
+        from obstacle_detector import ObstacleDetectorNode
+        nodes.append(ObstacleDetectorNode())
+    if 'xbox' in names:
+        from xbox_controller import XboxControllerNode
+        nodes.append(XboxControllerNode())
+    return nodes
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="wolfwagen nodes in one process")
+    parser.add_argument("--profile", default="V6", help="lane detection profile (see lane_detection/profiles.py)")
+    parser.add_argument("--nodes", nargs="+", default=NODES, choices=NODES)
+    parser.add_argument("--shared-frames", action="store_true", help="read the camera images from frame_hub.py")
+    opts = parser.parse_args(remove_ros_args(args if args is not None else sys.argv)[1:])
+
+    setup_logging()
+    rclpy.init(args=args)
+    frames = FrameHub()
+    source = SharedFrames(frames) if opts.shared_frames else frames
+    nodes = create_nodes(opts.nodes, opts.profile, source)
+    log.info("nodes: %s", ", ".join(node.get_name() for node in nodes))
+
+    executor = MultiThreadedExecutor()
+    executor.add_node(frames)
+    for node in nodes:
+        executor.add_node(node)
+    thread = threading.Thread(target=executor.spin, daemon=True)
+    thread.start()
+
+    loops = [threading.Thread(target=node.run, name=node.get_name(), daemon=True) for node in nodes]
+    for loop in loops:
+        loop.start()
+    try:
+        for loop in loops:
+            loop.join()
+    except KeyboardInterrupt:
+        pass
+
+    executor.shutdown()
+    for node in nodes + [frames]:
+        node.destroy_node()
+    rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import logging
 import platform
 import time
 from math import modf
@@ -8,6 +9,10 @@ from rclpy.node import Node
 from sensor_msgs.msg import Joy
 from std_msgs.msg import Header
 from inputs import devices, UnpluggedError
+from node_log import setup_logging
+from qos import EVENT
+
+log = logging.getLogger("controller_node")
 
 # Microsoft X-Box One S pad
 XONE_CODE_MAP = {
@@ -67,7 +72,7 @@ class JoystickRos2(Node):
         self.joy.buttons = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
 
         # Joy publisher
-        self.publisher_ = self.create_publisher(Joy, 'joy', 10)
+        self.publisher_ = self.create_publisher(Joy, 'joy', EVENT)
 
         # logic params
         self.last_event = None
@@ -96,7 +101,7 @@ class JoystickRos2(Node):
             try:
                 gamepad = device_manager.gamepads[0]
             except IndexError:
-                print('Joystick not found. Will retry every second.')
+                log.warning('Joystick not found. Will retry every second.')
                 time.sleep(1)
 
                 device_manager.find_devices()
@@ -104,7 +109,7 @@ class JoystickRos2(Node):
 
             # detected joystick is not keymapped yet
             if (gamepad.name not in JOYSTICK_CODE_VALUE_MAP):
-                print('Sorry, joystick type not supported yet! Please plug in supported joystick')
+                log.warning('Sorry, joystick type not supported yet! Please plug in supported joystick')
                 time.sleep(1)
                 device_manager.find_devices()
                 continue
@@ -123,7 +128,7 @@ class JoystickRos2(Node):
                     events = gamepad._do_iter()
                 # check unplugged joystick
                 except OSError:
-                    print('Joystick not found. Will retry every second.')
+                    log.warning('Joystick not found. Will retry every second.')
                     time.sleep(1)
                     device_manager.find_devices()
                     break
@@ -151,6 +156,7 @@ class JoystickRos2(Node):
             time.sleep(self.sleep_time)
 
 def main(args=None):
+    setup_logging()
     rclpy.init(args=args)
 
     controller_node = JoystickRos2()
@@ -9,6 +9,7 @@ import threading
 import matplotlib.pyplot as plt
 import matplotlib.animation as anim
 from collections import deque
+from qos import COMMAND
 
 # graph axis limit constants
 # > the interval in milliseconds between graph updates
@@ -37,7 +38,7 @@ def main() -> None:
         Int64,
         "lane",
         lane_callback,
-        10
+        COMMAND
     )
 
     thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# Frame hub: receives the camera images once and shares them with the camera nodes of the other processes.
+#
+#   ./frame_hub.py                                     # the stereo and the rgb_raw topic of the ZED 2i
+#   ./frame_hub.py --ros-args -p topics:="['/zed2i/zed_node/stereo/image_rect_color']" -p slots:=4
+#
+#   ./LaneDetectionV6.py --ros-args -p shared_frames:=true     # the nodes read the frames from the hub
+#
+# Each image is copied into a ring of shared memory slots (see frame_ring.py) and only a descriptor is published
+# on frame_hub/<camera topic> (std_msgs/Int64MultiArray, see DESCRIPTOR). The nodes map the ring and use the pixels
+# in place, so the image is deserialized once (here) instead of once per node.
+# In one process (composition.py), the nodes share the image messages directly and don't need the hub.
+import logging
+import threading
+
+import rclpy
+from builtin_interfaces.msg import Time
+from rclpy.node import Node
+from sensor_msgs.msg import Image
+from std_msgs.msg import Header, Int64MultiArray
+
+from frame_ring import FrameRing, ring_name
+from image_msg import ENCODING_CHANNELS
+from node_log import setup_logging
+from qos import SENSOR, COMMAND
+
+log = logging.getLogger("frame_hub")
+
+TOPICS = ['/zed2i/zed_node/stereo/image_rect_color', '/zed2i/zed_node/rgb_raw/image_raw_color']
+
+# Int64MultiArray data of a descriptor
+DESCRIPTOR = ('slot', 'seq', 'sec', 'nanosec', 'height', 'width', 'step')
+
+
+def descriptor_topic(topic):
+    return 'frame_hub' + topic
+
+
+class FrameHubNode(Node):
+
+    def __init__(self):
+        super().__init__("frame_hub")
+        self.slots = self.declare_parameter('slots', 4).value
+        self.rings = {}     # topic -> FrameRing, created with the first image (its size is not known before)
+        self.seqs = {}
+        self.descriptor_publishers = {}
+        for topic in self.declare_parameter('topics', TOPICS).value:
+            self.seqs[topic] = 0
+            self.descriptor_publishers[topic] = self.create_publisher(Int64MultiArray, descriptor_topic(topic), COMMAND)
+            self.create_subscription(Image, topic, lambda msg, topic=topic: self.image_callback(topic, msg), SENSOR)
+            log.info("sharing %s on %s", topic, descriptor_topic(topic))
+
+    def image_callback(self, topic, msg):
+        ring = self.rings.get(topic)
+        if ring is None:
+            if msg.encoding not in ENCODING_CHANNELS:
+                log.error("%s: encoding %s is not supported", topic, msg.encoding)
+                return
+            ring = self.rings[topic] = FrameRing.create(ring_name(topic), msg.height*msg.step, msg.encoding, self.slots)
+            log.info("%s: %dx%d %s, %d slots", topic, msg.width, msg.height, msg.encoding, self.slots)
+
+        if msg.encoding != ring.encoding or msg.height*msg.step > ring.slot_size:
+            log.error("%s: %dx%d %s does not fit the ring of the first image",
+                      topic, msg.width, msg.height, msg.encoding)
+            return
+
+        self.seqs[topic] += 1
+        seq = self.seqs[topic]
+        slot = ring.write(seq, msg.data)
+
+        m = Int64MultiArray()
+        m.data = [slot, seq, msg.header.stamp.sec, msg.header.stamp.nanosec, msg.height, msg.width, msg.step]
+        self.descriptor_publishers[topic].publish(m)
+
+    def destroy_node(self):
+        for ring in self.rings.values():
+            ring.close()
+        super().destroy_node()
+
+
+class SharedFrame:
+    # A frame in the ring. It has the fields of sensor_msgs/Image that the nodes use (header.stamp, height,
+    # width, encoding, step, data), so it can be decoded like an image message (data is a view of the slot).
+    # image: the frame as a numpy view (nothing is copied). The slot is reused 'slots' frames later:
+    # valid() tells whether the pixels are still the ones of this frame. data and image are None once the ring
+    # was closed (the hub restarted)
+
+    def __init__(self, ring, slot, seq, sec, nanosec, height, width, step):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.header = Header(stamp=Time(sec=sec, nanosec=nanosec))
+        self.height = height
+        self.width = width
+        self.step = step
+        self.encoding = ring.encoding
+
+    @property
+    def data(self):
+        return self.ring.slot(self.slot, self.height*self.step)
+
+    @property
+    def image(self):
+        return self.ring.image(self.slot, self.height, self.width, self.step)
+
+    def valid(self):
+        return self.ring.valid(self.slot, self.seq)
+
+
+def frame_valid(msg):
+    # False if msg is a SharedFrame whose slot was reused since it was received (image messages are always valid).
+    # A node checks it after it used the pixels, and drops what it computed from an overwritten frame
+    return not isinstance(msg, SharedFrame) or msg.valid()
+
+
+class SharedFrames:
+    # Client of the frame hub, for the nodes of another process.
+    # subscribe(topic, callback): callback(frame) is called with a SharedFrame for every image of the camera topic
+    # (the same interface as composition.FrameHub). The callbacks must not modify the pixels
+
+    def __init__(self, node):
+        self.node = node
+        self.rings = {}
+        self.last_seqs = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        self.last_seqs[topic] = 0
+        self.node.create_subscription(Int64MultiArray, descriptor_topic(topic),
+                                      lambda msg: self.descriptor_callback(topic, msg, callback), SENSOR)
+
+    def ring(self, topic, seq):
+        # attaches the ring of the topic, again if the hub was restarted (the sequence numbers start over)
+        with self.lock:
+            ring = self.rings.get(topic)
+            if ring is not None and seq <= self.last_seqs[topic]:
+                log.info("%s: frame hub restarted", topic)
+                ring.close()
+                ring = None
+            if ring is None:
+                try:
+                    ring = self.rings[topic] = FrameRing.attach(ring_name(topic))
+                except FileNotFoundError:
+                    self.rings.pop(topic, None)
+                    log.warning("%s: no frame ring (is frame_hub.py running?)", topic)
+                    return None
+            self.last_seqs[topic] = seq
+            return ring
+
+    def descriptor_callback(self, topic, msg, callback):
+        slot, seq, sec, nanosec, height, width, step = msg.data
+        ring = self.ring(topic, seq)
+        if ring is None:
+            return
+        frame = SharedFrame(ring, slot, seq, sec, nanosec, height, width, step)
+        if not frame.valid():
+            # overwritten before we got the descriptor (this node is more than 'slots' frames behind)
+            log.debug("%s: frame %d dropped", topic, seq)
+            return
+        callback(frame)
+
+
+def main(args=None):
+    setup_logging()
+    rclpy.init(args=args)
+    node = FrameHubNode()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        pass
+    node.destroy_node()
+    rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import struct
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from image_msg import ENCODING_CHANNELS, image_view
+
+# Ring of camera frames in shared memory (written by frame_hub.py, read by the camera nodes of other processes).
+#
+# Layout of the shared memory block:
+#   0:   slots, slot size (int64), encoding (32 bytes, ascii)
+#   64:  sequence number of the frame in each slot (int64 per slot, -1 while the slot is being written)
+#   ...: the slots (64-byte aligned), one frame each: height * step bytes, rows as in sensor_msgs/Image
+#
+# The writer puts frame 'seq' in slot seq % slots, so a frame stays in place until 'slots' newer frames have been
+# written. A reader uses the pixels in place (view), and can check with valid() that they were not overwritten
+# in the meantime.
+
+HEADER = struct.Struct("qq32s")
+SEQS_OFFSET = 64
+
+
+def ring_name(topic):
+    # name of the shared memory block of a camera topic
+    return "wolfwagen" + topic.replace("/", "_")
+
+
+def align(offset, alignment=64):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class FrameRing:
+    # FrameRing.create(name, slot_size, encoding, slots): new block (the writer, the owner of the block)
+    # FrameRing.attach(name): existing block (readers)
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        slots, self.slot_size, encoding = HEADER.unpack_from(shm.buf, 0)
+        self.slots = slots
+        self.encoding = encoding.rstrip(b"\0").decode("ascii")
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=SEQS_OFFSET)
+        self.data_offset = align(SEQS_OFFSET + 8*slots)
+
+    @classmethod
+    def create(cls, name, slot_size, encoding, slots=4):
+        if slots < 2:
+            raise ValueError("a frame ring needs at least 2 slots, got %d" % slots)
+        size = align(SEQS_OFFSET + 8*slots) + slots*slot_size
+        try:
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # left over by a hub that did not exit cleanly
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, slots, slot_size, encoding.encode("ascii"))
+        np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=SEQS_OFFSET)[:] = -1
+        return cls(shm, True)
+
+    @classmethod
+    def attach(cls, name):
+        # raises FileNotFoundError if the hub did not create the block (yet)
+        shm = shared_memory.SharedMemory(name)
+        # Before Python 3.13 the resource tracker of this process would unlink the block when the process exits,
+        # even though the hub still uses it. Only the owner unlinks it
+        # (it registered the name with the leading slash of shm_open on POSIX)
+        resource_tracker.unregister(shm.name if os.name == "nt" else "/" + shm.name, "shared_memory")
+        return cls(shm, False)
+
+    def slot(self, index, size=None):
+        # bytes of a slot (memoryview, nothing is copied), None once the ring is closed (see valid())
+        start = self.data_offset + index*self.slot_size
+        buf = self.shm.buf
+        if self.seqs is None or buf is None:
+            return None
+        try:
+            return buf[start:start + (self.slot_size if size is None else size)]
+        except ValueError:
+            # released by close() on another thread in the meantime
+            return None
+
+    def write(self, seq, data):
+        # Copies data (bytes-like, at most slot_size bytes) into the slot of frame seq. Returns the slot
+        data = np.frombuffer(data, dtype=np.uint8)
+        if len(data) > self.slot_size:
+            raise ValueError("frame of %d bytes does not fit in a slot of %d bytes" % (len(data), self.slot_size))
+        index = seq % self.slots
+        self.seqs[index] = -1
+        np.frombuffer(self.slot(index, len(data)), dtype=np.uint8)[:] = data
+        self.seqs[index] = seq
+        return index
+
+    def valid(self, index, seq):
+        # True if frame seq is (still) in slot index, False once the ring is closed (by another thread, e.g. when
+        # SharedFrames attaches the ring of a restarted hub)
+        seqs = self.seqs
+        return seqs is not None and bool(seqs[index] == seq)
+
+    def image(self, index, height, width, step):
+        # View of the frame in a slot as an image (height x width x channels, or height x width for mono8),
+        # None once the ring is closed
+        buffer = self.slot(index, height*step)
+        if buffer is None:
+            return None
+        return image_view(buffer, height, width, step, ENCODING_CHANNELS[self.encoding])
+
+    def close(self):
+        self.seqs = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # a reader still holds a view of a slot, the block is unmapped when that view is gone
+            pass
+        if self.owner:
+            self.shm.unlink()
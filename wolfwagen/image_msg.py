@@ -0,0 +1,36 @@
+import numpy as np
+
+# sensor_msgs/Image as a numpy array, without copying the pixels when the encoding allows it (lane detection node,
+# stop sign node, frame ring of frame_hub.py).
+#
+#   frame = decode_image(msg)     # view over msg.data, or cv_bridge for the other encodings
+#
+# msg can be a frame_hub.SharedFrame too: decode_image returns None if its frame ring was closed in the meantime
+# (the hub restarted), the caller drops the frame like one that was overwritten (see frame_hub.frame_valid).
+
+# number of channels of the 8-bit encodings that can be used without cv_bridge
+ENCODING_CHANNELS = {"bgra8": 4, "rgba8": 4, "bgr8": 3, "rgb8": 3, "mono8": 1}
+
+bridge = None   # CvBridge, created when an image needs it
+
+
+def image_view(buffer, height, width, step, channels):
+    # height x width x channels (height x width for 1 channel) array over buffer, rows 'step' bytes apart
+    if channels == 1:
+        return np.ndarray(shape=(height, width), dtype=np.uint8, buffer=buffer, strides=(step, 1))
+    return np.ndarray(shape=(height, width, channels), dtype=np.uint8, buffer=buffer, strides=(step, channels, 1))
+
+
+def decode_image(msg):
+    # Returns the image as a numpy view over msg.data (nothing is copied)
+    global bridge
+    data = msg.data
+    if data is None:
+        return None
+    channels = ENCODING_CHANNELS.get(msg.encoding)
+    if channels is None:
+        if bridge is None:
+            from cv_bridge import CvBridge
+            bridge = CvBridge()
+        return bridge.imgmsg_to_cv2(msg)
+    return image_view(data, msg.height, msg.width, msg.step, channels)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# Offline replay benchmark for the lane detection versions.
+#
+# Runs every lane detection profile (lane_detection/profiles.py) over a directory of recorded frames
+# (e.g. the PNGs written by ml_lane/lane_image_dataset_generate_node.py) without a ROS graph, and reports
+# frames/sec, the per-frame latency distribution and the CTE / turn decisions.
+#
+#   ./lane_benchmark.py ~/data                       # all versions
+#   ./lane_benchmark.py ~/data -v V6 V7 --csv out.csv
+#   ./lane_benchmark.py ~/data -v V7 --lines hough sliding_window   # compare the line extractors
+#   ./lane_benchmark.py ~/data -v V7 --levels 1 2 --refine          # latency/accuracy at 1/2 and 1/4 scale
+#   ./lane_benchmark.py ~/data -v V7 --split                         # left/right halves on two threads
+#   ./lane_benchmark.py ~/data --cooldown 0.5                        # shorter turn cooldown for short recordings
+#
+# A version that raises on a frame stops the benchmark with the traceback (and the name of the frame).
+#
+# Note: V4/V5 were written for the mono camera (rgb_raw) and V6+ for the stereo image (stereo/image_rect_color),
+# so every version gets the same frames but not every version makes sense on every recording.
+import argparse
+import csv
+import glob
+import math
+import os
+import random
+import re
+import time
+
+import cv2
+import numpy as np
+
+from lane_detection import LaneDetector, PROFILES, LINE_EXTRACTORS, get_profile
+from lane_detection.intersection import COOLDOWN
+from lane_detection.profiles import STEERING
+from lane_detection.stage_timer import StageTimer
+
+VERSIONS = list(PROFILES)
+
+
+class ReplayClock:
+    # Clock of the lane detector: follows the recording (frame index / fps) so that the
+    # "3 seconds since the last turn" checks behave the same on every run
+    def __init__(self, fps: float):
+        self.fps = fps
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def tick(self, index):
+        self.now = index / self.fps
+
+
+def natural_key(path: str):
+    return [int(s) if s.isdigit() else s for s in re.split(r"(\d+)", os.path.basename(path))]
+
+
+def load_frames(directory: str, max_frames: int) -> list:
+    paths = sorted(glob.glob(os.path.join(directory, "*.png")) + glob.glob(os.path.join(directory, "*.jpg")),
+                   key=natural_key)
+    if max_frames > 0:
+        paths = paths[:max_frames]
+    frames = []
+    for p in paths:
+        img = cv2.imread(p, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            continue
+        if img.ndim == 3 and img.shape[2] == 3:
+            # the camera publishes bgra8
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        frames.append((os.path.basename(p), img))
+    return frames
+
+
+def label(version: str, options: dict) -> str:
+    parts = [version]
+    if options.get("lines"):
+        parts.append(options["lines"])
+    if options.get("tracking"):
+        parts.append("tracked")
+    if options.get("levels"):
+        parts.append("1/%d" % 2**options["levels"])
+    if options.get("refine"):
+        parts.append("refined")
+    if options.get("birdseye"):
+        parts.append("birdseye")
+    if options.get("split"):
+        parts.append("split")
+    if options.get("normalize"):
+        parts.append("normalized")
+    return " ".join(parts)
+
+
+def variants(opts) -> list:
+    # get_profile options of every configuration to run. The first one (the version as it is) is the reference
+    # for the CTE error of the others
+    configs = [{}]
+    for lines in opts.lines or [None]:
+        for tracking in [False, True] if opts.tracking else [False]:
+            for levels in opts.levels or [0]:
+                for refine in [False, True] if opts.refine and levels else [False]:
+                    options = {k: v for k, v in (("lines", lines), ("tracking", tracking), ("levels", levels),
+                                                 ("refine", refine)) if v}
+                    if options not in configs:
+                        configs.append(options)
+    if opts.birdseye:
+        for levels in opts.levels or [0]:
+            configs.append({"birdseye": True, "levels": levels} if levels else {"birdseye": True})
+    if opts.split:
+        for options in [c for c in configs if not c.get("tracking") and not c.get("birdseye")]:
+            configs.append(dict(options, split=True))
+    if opts.normalize:
+        configs += [dict(options, normalize=True) for options in configs]
+    return configs
+
+
+def benchmark(version: str, frames: list, fps: float, warmup: int, options: dict, cooldown=None) -> dict:
+    clock = ReplayClock(fps)
+    detector = LaneDetector(get_profile(version, **options), StageTimer(True), clock)
+    if cooldown is not None and hasattr(detector.intersection, "cooldown"):
+        detector.intersection.cooldown = cooldown
+    random.seed(0)
+
+    latencies = []
+    results = []
+    for i, (name, frame) in enumerate(frames):
+        clock.tick(i)
+        start = time.perf_counter()
+        try:
+            result = detector.process(frame, False)
+        except Exception:
+            print("%s failed on frame %s" % (label(version, options), name))
+            raise
+        cte, turning_direction = result.cte, result.turn
+        elapsed = time.perf_counter() - start
+        detector.timer.end()
+
+        if i >= warmup:
+            latencies.append(elapsed)
+        results.append((name, cte, turning_direction))
+
+    return {"version": label(version, options), "base": version, "latencies": np.array(latencies),
+            "results": results, "stages": detector.timer.percentiles()}
+
+
+def print_report(reports: list, verbose: bool) -> None:
+    print("%-30s %7s %8s %8s %8s %8s %8s %7s %7s %7s %7s" % (
+        "ver", "frames", "fps", "p50 ms", "p95 ms", "p99 ms", "max ms", "left", "right", "CTE sd", "CTE err"))
+    reference = {}
+    for r in reports:
+        reference.setdefault(r["base"], r)
+    for r in reports:
+        lat = r["latencies"] * 1000.0
+        if len(lat) == 0:
+            print("%-30s (no frames)" % r["version"])
+            continue
+        p50, p95, p99 = np.percentile(lat, (50, 95, 99))
+        turns = [t for _, _, t in r["results"]]
+        ctes = np.array([c for _, c, _ in r["results"] if isinstance(c, (int, float, np.number))], dtype=float)
+        # mean absolute CTE difference to the version as it is (first report of the version)
+        diffs = [abs(c - rc) for (_, c, _), (_, rc, _) in zip(r["results"], reference[r["base"]]["results"])
+                 if isinstance(c, (int, float, np.number)) and isinstance(rc, (int, float, np.number))]
+        print("%-30s %7d %8.1f %8.2f %8.2f %8.2f %8.2f %7d %7d %7.1f %7.1f" % (
+            r["version"], len(r["results"]), 1000.0 / lat.mean(), p50, p95, p99, lat.max(),
+            turns.count(1), turns.count(2), ctes.std() if len(ctes) else float("nan"),
+            np.mean(diffs) if diffs else float("nan")))
+
+    if verbose:
+        for r in reports:
+            if not r["stages"]:
+                continue
+            print("\n%s stages (p50 / p95 / p99 ms)" % r["version"])
+            for stage, (p50, p95, p99) in r["stages"].items():
+                print("  %-14s %7.2f %7.2f %7.2f" % (stage, p50, p95, p99))
+
+
+def write_csv(path: str, reports: list) -> None:
+    # one row per frame: the CTE and turn decision of every version side by side
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        header = ["frame"]
+        for r in reports:
+            header += [r["version"] + " CTE", r["version"] + " turn"]
+        writer.writerow(header)
+        for rows in zip(*[r["results"] for r in reports]):
+            line = [rows[0][0]]
+            for _, cte, turn in rows:
+                line += [cte, turn]
+            writer.writerow(line)
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay recorded frames through the lane detection versions (no ROS graph needed)")
+    parser.add_argument("frames", help="directory with recorded frames (*.png, *.jpg)")
+    parser.add_argument("-v", "--versions", nargs="+", default=VERSIONS, choices=VERSIONS)
+    parser.add_argument("--lines", nargs="+", choices=list(LINE_EXTRACTORS),
+                        help="run the V6+ versions with these line extractors instead of their own")
+    parser.add_argument("--tracking", action="store_true", help="also run the V6+ versions with lane tracking")
+    parser.add_argument("--levels", nargs="+", type=int, choices=[0, 1, 2],
+                        help="run the V6+ versions at these pyramid levels (1: 1/2 scale, 2: 1/4 scale)")
+    parser.add_argument("--refine", action="store_true", help="also run the pyramid levels with full-scale refinement")
+    parser.add_argument("--birdseye", action="store_true", help="also run the V6+ versions in bird's-eye mode")
+    parser.add_argument("--normalize", action="store_true",
+                        help="also run every configuration with gamma normalization")
+    parser.add_argument("--split", action="store_true",
+                        help="also run the V6+ versions with the ROI halves processed concurrently")
+    parser.add_argument("--fps", type=float, default=30.0,
+                        help="frame rate of the recording (for the turn timing logic)")
+    parser.add_argument("--cooldown", type=float,
+                        help="seconds without intersection checks at the start and after a turn (default: %.1f)"
+                        % COOLDOWN)
+    parser.add_argument("--max-frames", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=3, help="frames not counted in the latency statistics")
+    parser.add_argument("--csv", help="write the per-frame CTE and turn decisions to this file")
+    parser.add_argument("--stages", action="store_true", help="also print the per-stage latency")
+    opts = parser.parse_args(args)
+
+    frames = load_frames(opts.frames, opts.max_frames)
+    if not frames:
+        print("no frames found in %s" % opts.frames)
+        return
+    print("%d frames (%dx%d)" % (len(frames), frames[0][1].shape[1], frames[0][1].shape[0]))
+    # The detectors start as if they had just turned, so no turn is reported in the first cooldown seconds
+    cooldown = opts.cooldown if opts.cooldown is not None else COOLDOWN
+    print("intersection checks start at frame %d (%.1f s cooldown at %.0f fps, see --cooldown)"
+          % (math.floor(cooldown * opts.fps) + 1, cooldown, opts.fps))
+
+    reports = []
+    for v in opts.versions:
+        for options in variants(opts):
+            if set(options) - {"normalize"} and get_profile(v).output != STEERING:
+                continue
+            reports.append(benchmark(v, frames, opts.fps, opts.warmup, options, opts.cooldown))
+    print_report(reports, opts.stages)
+    if opts.csv:
+        write_csv(opts.csv, reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# Configurable lane detection engine. Every LaneDetection version is a profile (see profiles.py);
+# the ROS node is ../lane_detection_node.py (outside of the package, so that the engine can be used without ROS)
+from .detector import LaneDetector, LaneResult
+from .lines import LaneLines
+from .profiles import Profile, PROFILES, LINE_EXTRACTORS, get_profile
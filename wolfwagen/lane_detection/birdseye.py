@@ -0,0 +1,170 @@
+import logging
+import math
+
+import cv2 as cv
+import numpy as np
+
+from .lines import LaneLines, SlidingWindowExtractor
+
+log = logging.getLogger(__name__)
+
+# Bird's-eye (inverse perspective) mode: the binary ROI is warped to a top-down grid of the ground in front of
+# the car with cv.remap tables computed once from the camera parameters, and the lane markings are fitted
+# in meters. CTE = lateral offset of the lane center at a lookahead distance.
+
+
+class CameraModel:
+    # Pinhole model of the eyes of the ZED camera (HD720: two 1280x720 images side by side) looking at flat ground.
+    # X: lateral (m, + = right), Z: forward (m) from the point on the ground below the middle of the camera.
+    # The defaults are nominal values: measure height and pitch on the car (and take fx, fy from the ZED calibration)
+
+    def __init__(self, fx=530.0, fy=530.0, cx=640.0, cy=360.0, height=0.25, pitch=12.0, baseline=0.12):
+        self.fx = fx
+        self.fy = fy
+        self.cx = cx
+        self.cy = cy
+        self.height = height    # above the ground (m)
+        self.pitch = math.radians(pitch)    # looking down (degrees)
+        self.baseline = baseline    # distance between the left and the right eye (m)
+
+    def project(self, X, Z, eye):
+        # ground point(s) -> (u, v) in the image of the eye (-1: left, +1: right)
+        c = math.cos(self.pitch)
+        s = math.sin(self.pitch)
+        x_c = X - eye*self.baseline/2
+        y_c = self.height*c - Z*s
+        z_c = Z*c + self.height*s
+        return self.fx*x_c/z_c + self.cx, self.fy*y_c/z_c + self.cy
+
+
+class BirdsEyeView:
+    # cv.remap tables from the stereo ROI (see roi.StereoRoi: left part of the left eye + right part of the right eye,
+    # bottom half) of a width x height frame to a top-down grid: 'lateral' m to each side, from 'near' to 'far' m
+    # ahead, 'resolution' m per pixel. Ground points left of the car are taken from the left eye, the others from
+    # the right eye; points that are not in the ROI are 0
+
+    def __init__(self, camera=None, width=2560, height=720, lateral=1.0, near=0.4, far=2.4, resolution=0.01):
+        self.camera = camera if camera is not None else CameraModel()
+        self.lateral = lateral
+        self.near = near
+        self.far = far
+        self.resolution = resolution
+
+        self.top = top = int(height/2)     # first row of the ROI in the frame
+        self.roi_shape = (height - 1 - top, width - 2*int(width/4))
+        # ROI columns [0, seam) come from the left eye, the others from the right eye
+        seam = int(width/2) - int(width/4)
+
+        # ground coordinates of the centers of the grid pixels
+        cols = int(round(2*lateral/resolution))
+        rows = int(round((far - near)/resolution))
+        X, Z = np.meshgrid(-lateral + (np.arange(cols) + 0.5)*resolution, far - (np.arange(rows) + 0.5)*resolution)
+
+        # the ROI column of a right-eye pixel is its column in the right eye image
+        u_left, v_left = self.camera.project(X, Z, -1)
+        u_right, v_right = self.camera.project(X, Z, +1)
+        map_x = np.where(X < 0, u_left, u_right)
+        map_y = np.where(X < 0, v_left, v_right) - top
+        outside = (map_y < 0) | (map_y > self.roi_shape[0] - 1) | np.where(X < 0, u_left >= seam, u_right < seam)
+        map_x[outside] = -1
+        map_y[outside] = -1
+        self.map_x = map_x.astype(np.float32)
+        self.map_y = map_y.astype(np.float32)
+        self.maps = {}  # scale -> fixed point maps (cv.convertMaps), built on first use
+
+        # CTE units: pixels of the ROI at its bottom row (so that the PID gains stay the same)
+        self.cte_per_meter = self.camera.fx / near
+
+    def warp(self, binary, scale=1):
+        # binary: ROI (or the pyrDown'd ROI, 'scale' times smaller) -> top-down grid, in one pass
+        if scale not in self.maps:
+            expected = (math.ceil(self.roi_shape[0]/scale), math.ceil(self.roi_shape[1]/scale))
+            if binary.shape[:2] != expected:
+                raise ValueError("bird's-eye view was built for a %dx%d ROI, got %dx%d"
+                                 % (expected[1], expected[0], binary.shape[1], binary.shape[0]))
+            self.maps[scale] = cv.convertMaps(self.map_x/scale, self.map_y/scale, cv.CV_16SC2)
+        map1, map2 = self.maps[scale]
+        return cv.remap(binary, map1, map2, cv.INTER_NEAREST, borderMode=cv.BORDER_CONSTANT, borderValue=0)
+
+    def to_ground(self, xs, ys):
+        # grid pixels -> ground coordinates (m)
+        return -self.lateral + (xs + 0.5)*self.resolution, self.far - (ys + 0.5)*self.resolution
+
+    def to_roi(self, X, Z, scale=1):
+        # ground points -> ROI pixels (the eye is picked the same way as for the remap tables)
+        u_left, v_left = self.camera.project(X, Z, -1)
+        u_right, v_right = self.camera.project(X, Z, +1)
+        return np.where(X < 0, u_left, u_right)/scale, (np.where(X < 0, v_left, v_right) - self.top)/scale
+
+
+class BirdsEyeExtractor:
+    # Line extractor in bird's-eye mode: sliding windows on the top-down grid find the markings, and
+    # x = poly(z) (order 2) is fitted to each of them in meters.
+    # The lane center at the lookahead distance gives the CTE (converted to ROI pixels, see BirdsEyeView) and the
+    # curvature. If only one marking is found, the other one is assumed lane_width m away (lane_width=None:
+    # +-missing_cte like the other extractors)
+    # The fitted markings are drawn on the lane image (projected back to the ROI)
+
+    def __init__(self, view=None, lookahead=1.0, lane_width=None, missing_cte=500, order=2, scale=1):
+        self.view = view if view is not None else BirdsEyeView()
+        self.lookahead = lookahead
+        self.lane_width = lane_width
+        self.missing_cte = missing_cte
+        self.order = order
+        self.scale = scale
+        # markings are about 2-5 cm wide: windows of +-15 cm, 2 m / 9 windows high
+        self.windows = SlidingWindowExtractor(windows=9, margin=int(0.15/self.view.resolution), min_pixels=20,
+                                              min_peak=5)
+
+    def scaled(self, scale):
+        # for the pyrDown'd ROI (pyramid mode): only the remap tables change
+        return BirdsEyeExtractor(self.view, self.lookahead, self.lane_width, self.missing_cte, self.order, scale)
+
+    def extract(self, binary, edge, timer):
+        top_down = self.view.warp(binary, self.scale)
+        timer.mark("birdseye")
+
+        height, width = binary.shape
+        lanes = LaneLines(0, np.empty((0, 4), dtype=int), height=height, center=int(width/2))
+
+        polys = {}
+        for side, (xs, ys, _) in self.windows.find_markings(top_down, timer).items():
+            X, Z = self.view.to_ground(xs, ys)
+            order = self.order if np.ptp(Z) > self.view.resolution*20 else 1
+            polys[side] = np.poly1d(np.polyfit(Z, X, deg=order))
+        timer.mark("windows")
+
+        L = self.lookahead
+        if "left" in polys and "right" in polys:
+            center = (polys["left"] + polys["right"]) / 2
+        elif polys and self.lane_width is not None:
+            side, poly = next(iter(polys.items()))
+            center = poly + (self.lane_width/2 if side == "left" else -self.lane_width/2)
+        else:
+            center = None
+
+        if center is not None:
+            lanes.offset = center(L)
+            d1 = center.deriv(1)(L)
+            d2 = center.deriv(2)(L) if center.order >= 2 else 0.0
+            lanes.curvature = d2 / (1 + d1*d1)**1.5
+            # CTE > 0: the lane center is left of the car (like car center - lane center in the image)
+            lanes.cte = -lanes.offset * self.view.cte_per_meter
+        elif "left" in polys:
+            lanes.cte = -self.missing_cte
+            log.info('cannot find right lane marking')
+        elif "right" in polys:
+            lanes.cte = self.missing_cte
+            log.info('cannot find left lane marking')
+        else:
+            log.info('cannot find any lane markings')
+
+        # the fitted markings, projected back to the ROI (drawn as segments)
+        Z = np.linspace(self.view.near, self.view.far, 10)
+        for poly in polys.values():
+            u, v = self.view.to_roi(poly(Z), Z, self.scale)
+            points = np.column_stack((u, v)).astype(int)
+            lanes.segments = np.vstack((lanes.segments, np.hstack((points[:-1], points[1:]))))
+
+        timer.mark("fitting")
+        return lanes
@@ -0,0 +1,90 @@
+import time
+
+import cv2 as cv
+
+from .overlay import draw_lanes
+from .pyramid import pyr_down, upscale
+from .stage_timer import StageTimer
+
+
+class LaneResult:
+    # image: lane image (the color ROI, with the lanes drawn over it when requested)
+    # cte: Cross Track Error (None if there is nothing to publish), turn: turning direction (see intersection.py)
+    # lanes: LaneLines of the frame (None when the frame was used for an intersection decision)
+    # intersection: IntersectionEvent when the frame was used for an intersection decision
+
+    def __init__(self, image, cte, turn, lanes=None, intersection=None):
+        self.image = image
+        self.cte = cte
+        self.turn = turn
+        self.lanes = lanes
+        self.intersection = intersection
+
+
+class LaneDetector:
+    # One lane detection pipeline:
+    #   ROI -> grayscale -> (normalization) -> edges -> intersection check -> lines -> (overlay)
+    # Each stage comes from the profile (see profiles.py), so every LaneDetection version runs on the same code.
+    # With profile.levels > 0, edges and lines are computed on the pyrDown'd ROI (see pyramid.py);
+    # the CTE and the lane image are still in full-resolution coordinates.
+    # With profile.split, the two halves of the ROI are processed concurrently (see parallel.py)
+    # 'clock' is only used for the intersection cooldown (the offline benchmark replaces it with the recording time)
+
+    def __init__(self, profile, timer=None, clock=time.time):
+        self.profile = profile
+        self.roi = profile.roi
+        self.edges = profile.edges
+        self.intersection = profile.intersection
+        self.lines = profile.lines
+        self.levels = profile.levels
+        self.refiner = profile.refiner
+        self.split = profile.split
+        self.normalizer = profile.normalizer
+        self.timer = timer if timer is not None else StageTimer(False)
+        self.clock = clock
+
+    def process(self, frame, draw=True):
+        timer = self.timer
+        timer.start()
+
+        # Crop first, so that color conversion, blur, threshold and Canny only run on the pixels we keep.
+        # The color ROI is also used for the lane image, so it is computed once and shared
+        cropped_color_frame = self.roi.crop(frame)
+        timer.mark("crop")
+        img = cv.cvtColor(cropped_color_frame, cv.COLOR_BGR2GRAY)
+        timer.mark("cvtColor")
+        if self.normalizer is not None:
+            img = self.normalizer.normalize(img, timer)
+
+        small = img
+        if self.levels:
+            small = pyr_down(img, self.levels)
+            timer.mark("pyrDown")
+
+        lanes = None
+        if self.split is not None:
+            # edges and lines of both halves at once (see parallel.py)
+            edge, lanes = self.split.run(small, self.edges, self.lines, timer)
+        else:
+            binary, edge = self.edges.detect(small, timer)
+
+        event = self.intersection.check(frame, edge, self.clock(), 2**self.levels)
+        timer.mark("intersection")
+        if event is not None:
+            if hasattr(self.lines, "reset"):
+                self.lines.reset()
+            return LaneResult(cropped_color_frame, 0, event.direction, intersection=event)
+
+        if lanes is None:
+            lanes = self.lines.extract(binary, edge, timer)
+        if self.levels:
+            lanes = upscale(lanes, 2**self.levels, img.shape)
+            if self.refiner is not None:
+                lanes = self.refiner.refine(img, lanes)
+                timer.mark("refine")
+
+        final = cropped_color_frame
+        if draw:
+            final = draw_lanes(cropped_color_frame, lanes)
+            timer.mark("overlay")
+        return LaneResult(final, lanes.cte, 0, lanes)
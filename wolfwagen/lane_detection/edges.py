@@ -0,0 +1,89 @@
+import functools
+
+import cv2 as cv
+import numpy as np
+
+# Edge detectors: detect(gray, timer) returns (binary, edge) for the grayscale ROI.
+# Normalizers: normalize(gray, timer) returns the grayscale ROI with its brightness corrected.
+
+
+@functools.lru_cache(maxsize=64)
+def gamma_table(gamma):
+    # 256-entry lookup table of the gamma correction, built once per gamma
+    return ((np.arange(256) / 255.0) ** (1.0 / gamma) * 255).astype(np.uint8)
+
+
+# Use this if image is too dark
+def adjust_gamma(image, gamma=1.0):
+    return cv.LUT(image, gamma_table(gamma))
+
+
+class GammaNormalizer:
+    # Photometric normalization: gamma correction that brings the median brightness of the ROI to 'target', so the
+    # fixed threshold of the edge detector keeps working when the lighting changes.
+    # The gamma is picked every 'every' frames from the histogram of every 'sample'-th pixel of every 'sample'-th
+    # row, rounded to 'step' and kept within [min_gamma, max_gamma] (so the tables come from the gamma_table cache);
+    # every frame costs one cv.LUT pass
+
+    def __init__(self, target=100, every=10, sample=8, min_gamma=0.4, max_gamma=2.5, step=0.05):
+        self.target = target
+        self.every = every
+        self.sample = sample
+        self.min_gamma = min_gamma
+        self.max_gamma = max_gamma
+        self.step = step
+        self.gamma = 1.0
+        self.frames = 0
+
+    def pick_gamma(self, gray):
+        small = np.ascontiguousarray(gray[::self.sample, ::self.sample])
+        histogram = cv.calcHist([small], [0], None, [256], [0, 256]).ravel()
+        median = int(np.searchsorted(np.cumsum(histogram), small.size/2))
+        # (median/255)**(1/gamma) = target/255
+        median = min(max(median, 1), 254)
+        gamma = np.log(median/255.0) / np.log(self.target/255.0)
+        gamma = min(max(gamma, self.min_gamma), self.max_gamma)
+        return round(round(gamma/self.step)*self.step, 2)
+
+    def normalize(self, gray, timer):
+        if self.frames % self.every == 0:
+            self.gamma = self.pick_gamma(gray)
+        self.frames += 1
+        if self.gamma != 1.0:
+            gray = adjust_gamma(gray, self.gamma)
+        timer.mark("gamma")
+        return gray
+
+
+class EdgeDetector:
+    # blur -> threshold -> Canny -> dilate
+    # blur=0 skips the blur, dilate=0 skips the dilation
+
+    def __init__(self, blur=7, threshold=160, max_value=255, canny=(70, 200), dilate=3):
+        self.blur = blur
+        self.threshold = threshold
+        self.max_value = max_value
+        self.canny = canny
+        self.kernel = cv.getStructuringElement(cv.MORPH_RECT, (dilate, dilate)) if dilate else None
+
+    def detect(self, gray, timer):
+        # remove noise
+        if self.blur:
+            gray = cv.GaussianBlur(gray, (self.blur, self.blur), 0)
+            timer.mark("GaussianBlur")
+
+        # thresholding. If seeing some noise, increase the lower threshold
+        _, binary = cv.threshold(gray, self.threshold, self.max_value, cv.THRESH_BINARY)
+        timer.mark("threshold")
+
+        # Canny Edge Detection
+        edge = cv.Canny(binary, self.canny[0], self.canny[1])
+        timer.mark("Canny")
+
+        # Edges could be too thin (which could make it difficult for Hough Transform to detect lines)
+        # So, make the edges thicker
+        if self.kernel is not None:
+            edge = cv.dilate(edge, self.kernel, iterations=1)
+            timer.mark("dilate")
+
+        return binary, edge
@@ -0,0 +1,278 @@
+import logging
+import random
+
+import cv2 as cv
+
+from .roi import stereo_roi, stitch
+
+log = logging.getLogger(__name__)
+
+# Intersection policies: check(frame, edge, now, scale) returns None when the car is not at an intersection
+# (or the check is on cooldown), otherwise an IntersectionEvent with the direction to take. 'scale' is how much
+# smaller than the full resolution ROI the edge image is (pyramid mode)
+
+# Turning directions
+NONE = 0        # no turn (keep following the lane)
+LEFT = 1
+RIGHT = 2
+STRAIGHT = 3    # go straight through the intersection, holding the current yaw
+
+DIRECTION_NAMES = {NONE: 'none', LEFT: 'left', RIGHT: 'right', STRAIGHT: 'straight'}
+
+# seconds without intersection checks after the start and after every turn
+COOLDOWN = 3.0
+
+
+class NoIntersection:
+    # V4/V5: no intersection handling
+
+    def check(self, frame, edge, now, scale=1):
+        return None
+
+
+class Region:
+    # Rectangle of the edge image, in fractions of its height (top, bottom) and width (left, right),
+    # so the same region works at any resolution (pyramid mode)
+
+    def __init__(self, top, bottom, left, right):
+        self.top = top
+        self.bottom = bottom
+        self.left = left
+        self.right = right
+
+    def bounds(self, shape):
+        height, width = shape[:2]
+        return (int(round(self.top*height)), int(round(self.bottom*height)),
+                int(round(self.left*width)), int(round(self.right*width)))
+
+
+class FrontBox:
+    # Box in front of the car, looking for the horizontal line at intersections (V6.1, V6.2).
+    # Rows are fractions of the frame height (bottom=None: down to the last row but one), columns are
+    # center*width +- half_width in the coordinates of the stereo image with the middle removed. The box is taken
+    # from the camera frame (it may reach above the ROI), blurred and thresholded like the ROI, and the front is
+    # open if the sum of the binary box is below threshold (the sums of the old LaneDetection scripts)
+
+    def __init__(self, top, bottom, center, half_width, threshold, blur=7, binary_threshold=160):
+        self.top = top
+        self.bottom = bottom
+        self.center = center
+        self.half_width = half_width
+        self.threshold = threshold
+        self.blur = blur
+        self.binary_threshold = binary_threshold
+
+    def is_open(self, frame):
+        height, width = frame.shape[:2]
+        rows = slice(int(height*self.top), height-1 if self.bottom is None else int(height*self.bottom))
+        center = int(width*self.center)
+        box = stitch(stereo_roi(frame, width, rows, slice(center - self.half_width, center + self.half_width)))
+
+        # only the pixels of the box are converted
+        box = cv.cvtColor(box, cv.COLOR_BGR2GRAY)
+        box = cv.GaussianBlur(box, (self.blur, self.blur), 0)
+        _, box = cv.threshold(box, self.binary_threshold, 255, cv.THRESH_BINARY)
+
+        total = 255 * cv.countNonZero(box)     # == box.sum()
+        log.debug("sum of front: %d", total)
+        return total < self.threshold
+
+
+def region_sum(integral, bounds):
+    # sum of the pixels of the region, in O(1) from the integral image
+    top, bottom, left, right = bounds
+    return integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+
+
+class IntersectionEvent:
+    # What the intersection check found: the open sides, the direction chosen (see the directions above),
+    # when (clock of the detector) and after how many frames in a row the intersection was seen.
+    # to_msg() / from_msg() convert it to / from a DiagnosticStatus (published on 'intersection' by the node)
+
+    def __init__(self, direction, front, left, right, time, frames):
+        self.direction = direction
+        self.front = front
+        self.left = left
+        self.right = right
+        self.time = time
+        self.frames = frames
+
+    def to_msg(self):
+        from diagnostic_msgs.msg import DiagnosticStatus, KeyValue
+
+        status = DiagnosticStatus()
+        status.name = 'intersection'
+        status.message = DIRECTION_NAMES[self.direction]
+        status.values = [KeyValue(key=key, value=str(value)) for key, value in (
+            ('direction', self.direction), ('front', int(self.front)), ('left', int(self.left)),
+            ('right', int(self.right)), ('time', self.time), ('frames', self.frames))]
+        return status
+
+    @staticmethod
+    def from_msg(msg):
+        values = {kv.key: kv.value for kv in msg.values}
+        return IntersectionEvent(int(values['direction']), values['front'] == '1', values['left'] == '1',
+                                 values['right'] == '1', float(values['time']), int(values['frames']))
+
+
+class IntegralIntersection:
+    # V6+: the car is at an intersection when the bottom left or the bottom right corner of the edge image has
+    # (almost) no edges. With a FrontBox, the front being open as well means going straight is an option.
+    # A corner is open when its sum is below 'threshold' (at full resolution, divided by 'scale' in pyramid mode:
+    # the edges are lines, their pixel count shrinks with the width); both corners are summed from one integral
+    # image of the edge image.
+    # Hysteresis: the intersection has to be seen in 'enter_frames' frames in a row before the chooser picks a
+    # direction, and after a turn the check is skipped for 'cooldown' seconds and then until the corners have been
+    # closed for 'exit_frames' frames in a row.
+    # check() returns None or an IntersectionEvent
+
+    def __init__(self, chooser, left=Region(170/359, 1, 0, 300/1280), right=Region(170/359, 1, 900/1280, 1),
+                 threshold=1000, front=None, enter_frames=3, exit_frames=3, cooldown=COOLDOWN):
+        # threshold: sum of the edge pixels of a corner, at most 3 edge pixels (255 each) at full resolution
+        self.chooser = chooser
+        self.left = left
+        self.right = right
+        self.threshold = threshold
+        self.front = front
+        self.enter_frames = enter_frames
+        self.exit_frames = exit_frames
+        self.cooldown = cooldown
+        self.last_turn_time = None
+        self.seen = 0       # frames in a row at an intersection
+        self.closed = 0     # frames in a row not at an intersection
+        self.armed = True   # False after a turn, until the corners have been closed for exit_frames
+
+    def is_open(self, integral, shape, region, threshold):
+        top, bottom, left, right = bounds = region.bounds(shape)
+        return bottom > top and right > left and region_sum(integral, bounds) < threshold
+
+    def check(self, frame, edge, now, scale=1):
+        if self.last_turn_time is None:
+            # no intersection right after start
+            self.last_turn_time = now
+        if now - self.last_turn_time <= self.cooldown:
+            # If it hasn't been more than 'cooldown' seconds since we did the last turning, don't check
+            return None
+
+        integral = cv.integral(edge, sdepth=cv.CV_32S)
+        left = self.is_open(integral, edge.shape, self.left, self.threshold/scale)
+        right = self.is_open(integral, edge.shape, self.right, self.threshold/scale)
+        front = self.front is not None and self.front.is_open(frame)
+
+        if not (left or right):
+            self.seen = 0
+            self.closed += 1
+            if self.closed >= self.exit_frames:
+                self.armed = True
+            return None
+
+        self.closed = 0
+        if not self.armed:
+            return None
+        self.seen += 1
+        log.debug("open: front=%d left=%d right=%d (%d/%d frames)", front, left, right, self.seen, self.enter_frames)
+        if self.seen < self.enter_frames:
+            return None
+
+        # 1: front, 2: left, 4: right (as seen in the last frame)
+        is_at_intersection = front + 2*left + 4*right
+        turning_direction = self.chooser.choose(is_at_intersection)
+        log.info("turning direction: %d", turning_direction)
+        event = IntersectionEvent(turning_direction, front, left, right, now, self.seen)
+        self.last_turn_time = now
+        self.seen = 0
+        self.armed = False
+        return event
+
+
+class RandomChooser:
+    # V6/V6.1: the only open side, or a random pick among the open ones
+
+    def choose(self, is_at_intersection):
+        if is_at_intersection == 2:
+            return LEFT
+        if is_at_intersection == 3:
+            return random.choice((LEFT, STRAIGHT))
+        if is_at_intersection == 4:
+            return RIGHT
+        if is_at_intersection == 5:
+            return random.choice((RIGHT, STRAIGHT))
+        if is_at_intersection == 6:
+            # both left and right are open
+            return random.randint(LEFT, RIGHT)
+        # Any direction
+        return random.randint(LEFT, STRAIGHT)
+
+
+class BalancedChooser:
+    # V7: when both left and right are open, balance the number of left and right turns.
+    # The counter starts at 3, each left turn decreases it by one and each right turn increases it by one.
+    # The random number is drawn from 1-5, so the lower the counter is, the higher the chance to go right
+
+    def __init__(self):
+        self.turn_counter = 3
+
+    def pick(self):
+        turning_direction = random.randint(1, 5)
+        if turning_direction < self.turn_counter:
+            return LEFT
+        if turning_direction > self.turn_counter:
+            return RIGHT
+        return None
+
+    def choose(self, is_at_intersection):
+        if is_at_intersection & 2 and not is_at_intersection & 4:
+            return LEFT
+        if is_at_intersection & 4 and not is_at_intersection & 2:
+            return RIGHT
+
+        # it may pick the value of turn counter: pick again, if it does it again, just pick from 1,2
+        turning_direction = self.pick() or self.pick() or random.randint(LEFT, RIGHT)
+        self.turn_counter += -1 if turning_direction == LEFT else 1
+
+        # if the turn counter is at the upper or lower limit reset to the middle
+        # this basically will happen when it has been unlucky and taken too many of the same turn types
+        if self.turn_counter == 5 or self.turn_counter == 1:
+            self.turn_counter = 3
+        return turning_direction
+
+
+class HistoryChooser:
+    # V6.2: prefer the directions that were taken less often in the recent turns.
+    # Returns NONE (no turn, keep following the lane) instead of STRAIGHT when going straight
+
+    def __init__(self, max_size=10):
+        self.turns = [NONE]
+        self.max_size = max_size   # Max size that the list can get to
+
+    def choose(self, is_at_intersection):
+        # Percentage of ones and twos in the recorded turns
+        length = len(self.turns)
+        ones = self.turns.count(LEFT)/length
+        twos = self.turns.count(RIGHT)/length
+
+        rand = random.random()
+
+        if is_at_intersection == 2:     # left (not recorded)
+            turning_direction = LEFT
+        elif is_at_intersection == 4:   # right (not recorded)
+            turning_direction = RIGHT
+        else:
+            if is_at_intersection == 3:     # straight or left
+                turning_direction = LEFT if rand > ones else NONE
+            elif is_at_intersection == 5:   # straight or right
+                turning_direction = RIGHT if rand > twos else NONE
+            elif is_at_intersection == 6:   # right or left
+                turning_direction = LEFT if rand > ones else RIGHT
+            elif rand > ones:               # Any direction
+                turning_direction = LEFT
+            elif rand > twos:
+                turning_direction = RIGHT
+            else:
+                turning_direction = NONE
+            self.turns.append(turning_direction)
+
+        # Cuts the turns list if it gets too long (removes the first half)
+        if length >= self.max_size:
+            del self.turns[:5]
+        return turning_direction
@@ -0,0 +1,330 @@
+import logging
+
+import cv2 as cv
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Line extractors: extract(binary, edge, timer) returns LaneLines for the thresholded and the edge image of the ROI.
+
+
+class LaneLines:
+    # What a line extractor found in the ROI
+    #   cte:      Cross Track Error (None if the extractor could not compute one, e.g. V4/V5 without lines)
+    #   segments: (N, 4) array of x1, y1, x2, y2 of the detected line segments (None if no lines were detected)
+    #   left, right: (x at the bottom, x at the top) of the fitted lane markings (None if not found)
+    #   height:   height of the ROI (y of the bottom)
+    #   center:   x of the car center in the ROI
+    #   offset, curvature: lateral offset (m, + = right) and curvature (1/m) of the lane center at the lookahead
+    #                      distance (only in bird's-eye mode, see birdseye.py)
+
+    def __init__(self, cte, segments=None, left=None, right=None, height=0, center=0):
+        self.cte = cte
+        self.segments = segments
+        self.left = left
+        self.right = right
+        self.height = height
+        self.center = center
+        self.offset = None
+        self.curvature = None
+
+
+def get_end_points(rho, theta):
+    # Note: cv.HoughLines return the <rho, theta> of each lines
+    # rho and theta are arrays (lines[:, 0, 0] and lines[:, 0, 1]), so the end points of all the lines are computed
+    # at once
+    rho = np.asarray(rho, dtype=np.float64)
+    theta = np.asarray(theta, dtype=np.float64)
+    a = np.cos(theta)
+    b = np.sin(theta)
+    x0 = a * rho
+    y0 = b * rho
+
+    # astype(int) truncates toward zero like int()
+    x1 = (x0 + 1000*(-b)).astype(int)
+    y1 = (y0 + 1000*(a)).astype(int)
+    x2 = (x0 - 1000*(-b)).astype(int)
+    y2 = (y0 - 1000*(a)).astype(int)
+
+    return x1, y1, x2, y2
+
+
+def split_lines(x1, y1, x2, y2, slope_threshold=0.2):
+    # Returns the masks of the left lines (slope <= 0) and the right lines (slope > 0).
+    # Vertical lines (x2 == x1) and lines with abs(slope) < slope_threshold are excluded
+    dx = x2 - x1
+    slope = np.divide(y2 - y1, dx, out=np.zeros(dx.shape), where=(dx != 0))
+    valid = (dx != 0) & (np.abs(slope) >= slope_threshold)
+    return valid & (slope <= 0), valid & (slope > 0)
+
+
+def fit_line(x1, y1, x2, y2):
+    # 1D fitting (x as a function of y) over both end points of the given lines
+    line_x = np.column_stack((x1, x2)).ravel()
+    line_y = np.column_stack((y1, y2)).ravel()
+    return np.polyfit(line_y, line_x, deg=1)
+
+
+class HoughLineExtractor:
+    # V6+: standard Hough Transform, one line fitted through the left lines and one through the right lines.
+    # CTE: see cross_track_error
+
+    def __init__(self, threshold=150, slope_threshold=0.2, missing_cte=500):
+        self.threshold = threshold
+        self.slope_threshold = slope_threshold
+        self.missing_cte = missing_cte
+
+    def scaled(self, scale):
+        # the same extractor for an image 'scale' times smaller (pyramid mode)
+        return HoughLineExtractor(max(1, int(self.threshold/scale)), self.slope_threshold, self.missing_cte)
+
+    def extract(self, binary, edge, timer):
+        # Non-probabilistic Hough Transform (works better than HoughLinesP)
+        lines = cv.HoughLines(edge, 1, np.pi/180, self.threshold, None, 0, 0)
+        timer.mark("HoughLines")
+
+        MIN_Y = 0   # <-- top of lane markings
+        MAX_Y = edge.shape[0]   # <-- bottom of lane markings
+        car_center = int(edge.shape[1]/2)   # center of camera
+
+        if lines is None:
+            log.info("No lines detected")
+            return LaneLines(0, height=MAX_Y, center=car_center)
+
+        # All the lines are processed at once (lines is a (N,1,2) array of <rho, theta>)
+        x1, y1, x2, y2 = get_end_points(lines[:, 0, 0], lines[:, 0, 1])
+        left, right = split_lines(x1, y1, x2, y2, self.slope_threshold)
+
+        cnt_left = int(np.count_nonzero(left))    # number of left lines
+        cnt_right = int(np.count_nonzero(right))   # number of right lines
+        log.debug("cnt_left, cnt_right = %d %d", cnt_left, cnt_right)
+
+        used = left | right
+        lanes = LaneLines(0, np.column_stack((x1[used], y1[used], x2[used], y2[used])), height=MAX_Y, center=car_center)
+
+        if cnt_left > 0:
+            # do 1D fitting
+            poly_left = np.poly1d(fit_line(x1[left], y1[left], x2[left], y2[left]))
+            lanes.left = (int(poly_left(MAX_Y)), int(poly_left(MIN_Y)))
+
+        if cnt_right > 0:
+            # do 1D fitting
+            poly_right = np.poly1d(fit_line(x1[right], y1[right], x2[right], y2[right]))
+            lanes.right = (int(poly_right(MAX_Y)), int(poly_right(MIN_Y)))
+
+        lanes.cte = cross_track_error(lanes, self.missing_cte)
+        timer.mark("fitting")
+        return lanes
+
+    def extract_side(self, binary, edge, side):
+        # Only the 'left' or the 'right' marking (e.g. in one half of the ROI, see parallel.py):
+        # returns its (x at the bottom, x at the top) or None, and the segments of that side
+        lines = cv.HoughLines(edge, 1, np.pi/180, self.threshold, None, 0, 0)
+        if lines is None:
+            return None, np.empty((0, 4), dtype=int)
+
+        x1, y1, x2, y2 = get_end_points(lines[:, 0, 0], lines[:, 0, 1])
+        left, right = split_lines(x1, y1, x2, y2, self.slope_threshold)
+        used = left if side == "left" else right
+        segments = np.column_stack((x1[used], y1[used], x2[used], y2[used]))
+        if not used.any():
+            return None, segments
+
+        poly = np.poly1d(fit_line(x1[used], y1[used], x2[used], y2[used]))
+        return (int(poly(edge.shape[0])), int(poly(0))), segments
+
+
+class SlidingWindowExtractor:
+    # Column histogram + sliding windows over the binary ROI (no Hough Transform).
+    # The peaks of the column histogram of the bottom rows (one in each half of the ROI) are where the left and
+    # right markings start. Then 'windows' windows stacked from the bottom up follow each marking: each window is
+    # 2*margin wide and re-centered on the mean x of its pixels when it has at least min_pixels of them.
+    # A line is fitted through the pixels of all the windows of each side. CTE as in HoughLineExtractor
+
+    def __init__(self, windows=9, margin=60, min_pixels=50, min_peak=10, histogram_rows=0.5, missing_cte=500):
+        self.windows = windows
+        self.margin = margin
+        self.min_pixels = min_pixels
+        self.min_peak = min_peak    # minimum number of marking pixels in the histogram peak column
+        self.histogram_rows = histogram_rows    # fraction of the rows (from the bottom) used for the histogram
+        self.missing_cte = missing_cte
+
+    def scaled(self, scale):
+        # the same extractor for an image 'scale' times smaller (pyramid mode)
+        return SlidingWindowExtractor(self.windows, max(1, int(self.margin/scale)),
+                                      max(1, int(self.min_pixels/scale**2)), max(1, int(self.min_peak/scale)),
+                                      self.histogram_rows, self.missing_cte)
+
+    def extract(self, binary, edge, timer):
+        height, width = binary.shape
+        MIN_Y = 0   # <-- top of lane markings
+        MAX_Y = height  # <-- bottom of lane markings
+        car_center = int(width/2)   # center of camera
+
+        lanes = LaneLines(0, np.empty((0, 4), dtype=int), height=MAX_Y, center=car_center)
+        for side, (xs, ys, centers) in self.find_markings(binary, timer).items():
+            # 1D fitting (x as a function of y) over the pixels of the marking
+            poly = np.poly1d(np.polyfit(ys, xs, deg=1))
+            setattr(lanes, side, (int(poly(MAX_Y)), int(poly(MIN_Y))))
+            # the path of the windows is drawn on the lane image
+            lanes.segments = np.vstack((lanes.segments, np.hstack((centers[:-1], centers[1:]))))
+        timer.mark("windows")
+
+        lanes.cte = cross_track_error(lanes, self.missing_cte)
+        timer.mark("fitting")
+        return lanes
+
+    def extract_side(self, binary, edge, side):
+        # Only one marking, starting at the histogram peak of the whole image (e.g. one half of the ROI, see
+        # parallel.py): returns its (x at the bottom, x at the top) or None, and the path of the windows
+        height, width = binary.shape
+        marking = self.find_marking(binary, self.histogram(binary), slice(0, width))
+        if marking is None:
+            return None, np.empty((0, 4), dtype=int)
+
+        xs, ys, centers = marking
+        poly = np.poly1d(np.polyfit(ys, xs, deg=1))
+        return (int(poly(height)), int(poly(0))), np.hstack((centers[:-1], centers[1:]))
+
+    def histogram(self, binary):
+        # number of marking pixels in each column of the bottom rows
+        bottom = binary[int(binary.shape[0]*(1 - self.histogram_rows)):]
+        return cv.reduce(bottom, 0, cv.REDUCE_SUM, dtype=cv.CV_32S).ravel() // 255
+
+    def find_markings(self, binary, timer):
+        # Returns {side: (x, y of the marking pixels, window centers)} of the markings found ('left' and/or 'right')
+        width = binary.shape[1]
+        center = int(width/2)
+
+        histogram = self.histogram(binary)
+        timer.mark("histogram")
+
+        markings = {}
+        for side, columns in (("left", slice(0, center)), ("right", slice(center, width))):
+            marking = self.find_marking(binary, histogram, columns)
+            if marking is not None:
+                markings[side] = marking
+        return markings
+
+    def find_marking(self, binary, histogram, columns):
+        # The marking starting at the histogram peak within 'columns', or None
+        peak = columns.start + int(np.argmax(histogram[columns]))
+        if histogram[peak] < self.min_peak:
+            return None
+        xs, ys, centers = self.follow(binary, peak)
+        if len(xs) < self.min_pixels:
+            return None
+        return xs, ys, centers
+
+    def follow(self, binary, x):
+        # Returns the x and y of the marking pixels found by the windows starting at column x (bottom of the ROI),
+        # and the (x, y) centers of the windows
+        height, width = binary.shape
+        window_height = max(1, height // self.windows)
+
+        xs = []
+        ys = []
+        centers = []
+        for i in range(self.windows):
+            y_hi = height - i*window_height
+            y_lo = 0 if i == self.windows - 1 else max(0, y_hi - window_height)
+            x_lo = max(0, x - self.margin)
+            x_hi = min(width, x + self.margin)
+
+            wy, wx = np.nonzero(binary[y_lo:y_hi, x_lo:x_hi])
+            xs.append(wx + x_lo)
+            ys.append(wy + y_lo)
+            centers.append((x, (y_lo + y_hi)//2))
+            if len(wx) >= self.min_pixels:
+                x = x_lo + int(wx.mean())
+
+        return np.concatenate(xs), np.concatenate(ys), np.array(centers)
+
+
+def cross_track_error(lanes, missing_cte):
+    # CTE = car center - lane center at the bottom of the ROI, +-missing_cte when only one side is found
+    if lanes.left is not None and lanes.right is not None:
+        lane_center = (lanes.right[0] + lanes.left[0])/2
+        return lanes.center - lane_center
+
+    if lanes.left is None and lanes.right is None:
+        log.info('cannot find any lane markings')
+        return 0
+    if lanes.left is None:
+        log.info('cannot find left lane marking')
+        return missing_cte
+    log.info('cannot find right lane marking')
+    return -missing_cte
+
+
+class SegmentAverageExtractor:
+    # V4/V5: probabilistic Hough Transform, the segments with positive and negative slopes are averaged and
+    # the "direction" is the distance of the averaged lines from the reference column 'center'.
+    #   filtered=False (V4): all segments are averaged, and the distance is measured at the segment ends
+    #   filtered=True (V5):  short and flat segments are dropped, and the distance is measured at the x-intercepts
+    #                        (-missing_cte if there is no negative line, +missing_cte if there is no positive line)
+
+    def __init__(self, center=700, filtered=False, slope_threshold=0.2, min_length=20, missing_cte=100):
+        self.center = center
+        self.filtered = filtered
+        self.slope_threshold = slope_threshold
+        self.min_length = min_length
+        self.missing_cte = missing_cte
+
+    def extract(self, binary, edge, timer):
+        lines = cv.HoughLinesP(edge, rho=1, theta=np.pi/180, threshold=100, minLineLength=20, maxLineGap=150)
+        timer.mark("HoughLines")
+
+        lanes = LaneLines(None, height=edge.shape[0], center=self.center)
+        if lines is None:
+            log.info("No lines detected")
+            return lanes
+
+        # (N,1,4) in OpenCV 4, (N,4) in newer versions
+        segments = lines.reshape(-1, 4)
+        x1, y1, x2, y2 = segments.T.astype(np.int64)
+        dx = x2 - x1
+        dy = y2 - y1
+
+        if self.filtered:
+            keep = dx != 0
+            slope = np.divide(dy, dx, out=np.zeros(dx.shape), where=keep)
+            keep &= np.abs(slope) >= self.slope_threshold
+            keep &= np.hypot(dx, dy) >= self.min_length
+            segments = segments[keep]
+            x1, y1, x2, y2, dx, dy = x1[keep], y1[keep], x2[keep], y2[keep], dx[keep], dy[keep]
+        lanes.segments = segments
+
+        # vertical segments (V4 only) have an inf/nan slope: nan counts as a negative slope
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pos = dy / dx > 0
+        neg = ~pos
+
+        if self.filtered and not neg.any():
+            lanes.cte = -self.missing_cte
+        elif self.filtered and not pos.any():
+            lanes.cte = self.missing_cte
+        if not pos.any() or not neg.any():
+            timer.mark("fitting")
+            return lanes
+
+        px1, py1, px2, py2 = (int(v[pos].mean()) for v in (x1, y1, x2, y2))
+        nx1, ny1, nx2, ny2 = (int(v[neg].mean()) for v in (x1, y1, x2, y2))
+
+        if self.filtered:
+            if py2 == py1 or ny2 == ny1:
+                timer.mark("fitting")
+                return lanes
+            # x-intercepts of the averaged lines
+            px_int = px1 - py1 * ((px2 - px1) / (py2 - py1))
+            nx_int = nx1 - ny1 * ((nx2 - nx1) / (ny2 - ny1))
+            dleft = int(nx_int - self.center)
+            dright = int(self.center - px_int)
+        else:
+            dleft = nx1 - self.center
+            dright = self.center - px2
+
+        log.debug("dleft: %d, dright: %d", dleft, dright)
+        lanes.cte = abs(dleft) if dleft > dright else dright
+        timer.mark("fitting")
+        return lanes
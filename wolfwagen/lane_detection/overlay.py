@@ -0,0 +1,55 @@
+import cv2 as cv
+import numpy as np
+
+# Lane image (for rviz2 or webviz): the detected lines and the lane drawn over the color ROI
+
+DOT_COLOR = [61, 217, 108]
+DOT_SIZE = 5
+
+LINE_COLOR = (255, 0, 0)
+LINE_THICKNESS = 2
+
+# LANE_COLOR = (0, 0, 255)
+LANE_COLOR = (255, 255, 0)
+LANE_THICKNESS = 5
+
+LANE_REGION_COLOR = (0, 255, 0)
+LANE_CENTER_COLOR = (0, 0, 255)
+
+CAR_CENTER_COLOR = (180, 180, 0)
+
+
+def draw_lanes(image, lanes):
+    # image: color ROI, lanes: LaneLines. Returns a new image (image is not modified)
+    if lanes.segments is None:
+        return image
+
+    line_image = np.zeros_like(image)
+    for x1, y1, x2, y2 in lanes.segments.tolist():
+        cv.line(line_image, (x1, y1), (x2, y2), LINE_COLOR, LINE_THICKNESS)
+        cv.circle(line_image, (x1, y1), DOT_SIZE, DOT_COLOR, -1)
+        cv.circle(line_image, (x2, y2), DOT_SIZE, DOT_COLOR, -1)
+
+    MIN_Y = 0   # <-- top of lane markings
+    MAX_Y = lanes.height    # <-- bottom of lane markings
+
+    for lane in (lanes.left, lanes.right):
+        if lane is not None:
+            cv.line(line_image, (lane[0], MAX_Y), (lane[1], MIN_Y), LANE_COLOR, LANE_THICKNESS)
+
+    if lanes.left is not None and lanes.right is not None:
+        left_x_start, left_x_end = lanes.left
+        right_x_start, right_x_end = lanes.right
+        cv.line(line_image, (int((left_x_start+right_x_start)/2), MAX_Y), (int((left_x_end + right_x_end)/2), MIN_Y),
+                LANE_CENTER_COLOR, 5)
+        cv.line(line_image, (lanes.center, MAX_Y), (lanes.center, MIN_Y), (255, 255, 0), 3)
+
+        # Draw lane region
+        mask = np.zeros_like(line_image)
+        vertices = np.array([[(left_x_start+10, MAX_Y), (left_x_end+10, MIN_Y),
+                              (right_x_end-10, MIN_Y), (right_x_start-10, MAX_Y)]], dtype=np.int32)
+        cv.fillPoly(mask, vertices, LANE_REGION_COLOR)
+
+        line_image = cv.addWeighted(line_image, 0.8, mask, 0.2, 0)
+
+    return cv.addWeighted(image, 1, line_image, 1, 0)
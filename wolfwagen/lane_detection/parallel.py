@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .lines import LaneLines, cross_track_error
+from .stage_timer import StageTimer
+
+# Split mode: the left and right markings are independent, so the left and the right half of the ROI go through
+# edge detection and line extraction concurrently (OpenCV releases the GIL in blur, threshold, Canny, dilate and
+# HoughLines), and the two fits are merged.
+# For the stereo ROI the halves are exactly the left-eye and the right-eye part (see roi.StereoRoi)
+
+
+class HalfSplitter:
+    # run() processes the right half on a worker thread and the left half on the calling thread.
+    # The line extractor has to support extract_side (HoughLineExtractor, SlidingWindowExtractor)
+
+    def __init__(self, workers=1):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lane_half")
+        self.no_timer = StageTimer(False)   # the stages of the halves overlap, only the whole split is timed
+
+    def half(self, gray, edges, lines, side):
+        binary, edge = edges.detect(gray, self.no_timer)
+        lane, segments = lines.extract_side(binary, edge, side)
+        return edge, lane, segments
+
+    def run(self, gray, edges, lines, timer):
+        # Returns the edge image of the whole ROI (for the intersection check) and the merged LaneLines
+        height, width = gray.shape
+        split = int(width/2)
+
+        right = self.pool.submit(self.half, gray[:, split:], edges, lines, "right")
+        left_edge, left_lane, left_segments = self.half(gray[:, :split], edges, lines, "left")
+        right_edge, right_lane, right_segments = right.result()
+        timer.mark("halves")
+
+        # right half coordinates -> ROI coordinates
+        right_segments = right_segments + (split, 0, split, 0)
+        if right_lane is not None:
+            right_lane = (right_lane[0] + split, right_lane[1] + split)
+
+        lanes = LaneLines(0, np.vstack((left_segments, right_segments)), left_lane, right_lane, height, int(width/2))
+        lanes.cte = cross_track_error(lanes, lines.missing_cte)
+        edge = np.hstack((left_edge, right_edge))
+        timer.mark("merge")
+        return edge, lanes
@@ -0,0 +1,150 @@
+from .birdseye import BirdsEyeExtractor
+from .edges import EdgeDetector, GammaNormalizer
+from .intersection import NoIntersection, IntegralIntersection, FrontBox, RandomChooser, BalancedChooser, HistoryChooser
+from .lines import HoughLineExtractor, SegmentAverageExtractor, SlidingWindowExtractor
+from .parallel import HalfSplitter
+from .pyramid import BandRefiner
+from .roi import StereoRoi, BottomRoi
+from .tracking import LaneTracker
+
+# One profile per historical LaneDetection version.
+# get_profile(name) builds new stages every time (the intersection choosers keep state)
+# get_profile(name, lines) replaces the line extractor of a (V6+) profile with one of LINE_EXTRACTORS,
+# and get_profile(name, tracking=True) tracks the lane markings from frame to frame (see tracking.py)
+# get_profile(name, levels=1 or 2) runs edges and lines at 1/2 or 1/4 scale (+ refine=True: refine at full scale)
+# get_profile(name, birdseye=True) fits the lanes in a top-down view, in meters (see birdseye.py)
+# get_profile(name, split=True) processes the left and right halves of the ROI concurrently (see parallel.py)
+# get_profile(name, normalize=True) corrects the brightness of the ROI before the edge detection (see edges.py)
+
+STEREO_TOPIC = '/zed2i/zed_node/stereo/image_rect_color'
+MONO_TOPIC = '/zed2i/zed_node/rgb_raw/image_raw_color'
+
+# What the node publishes
+STEERING = 'steering'   # PID steering command on 'pid_steering' (+ turns at intersections, needs the pose)
+LANE = 'lane'           # the raw "direction" on 'lane' (V4/V5, steered by another node)
+
+
+class Profile:
+    # levels: number of pyrDown before the edge detection (pyramid mode), refiner: BandRefiner or None
+    # split: HalfSplitter or None, normalizer: GammaNormalizer or None
+
+    def __init__(self, name, camera_topic, output, roi, edges, intersection, lines, levels=0, refiner=None, split=None,
+                 normalizer=None):
+        self.name = name
+        self.camera_topic = camera_topic
+        self.output = output
+        self.roi = roi
+        self.edges = edges
+        self.intersection = intersection
+        self.lines = lines
+        self.levels = levels
+        self.refiner = refiner
+        self.split = split
+        self.normalizer = normalizer
+
+
+def v4():
+    return Profile('V4', MONO_TOPIC, LANE, BottomRoi(360),
+                   EdgeDetector(blur=0, threshold=150, max_value=180, canny=(100, 500), dilate=0),
+                   NoIntersection(),
+                   SegmentAverageExtractor(center=700))
+
+
+def v5():
+    return Profile('V5', MONO_TOPIC, LANE, BottomRoi(360),
+                   EdgeDetector(blur=0, threshold=150, max_value=180, canny=(100, 500), dilate=0),
+                   NoIntersection(),
+                   SegmentAverageExtractor(center=621, filtered=True))
+
+
+def v6():
+    return Profile('V6', STEREO_TOPIC, STEERING, StereoRoi(), EdgeDetector(),
+                   IntegralIntersection(RandomChooser()),
+                   HoughLineExtractor())
+
+
+def v6_1():
+    # front box: the middle third of the frame height, columns 1080..1280, i.e. the last 200 columns of the right
+    # eye (the rest of the box is beyond the right border), open with less than 4 white pixels
+    return Profile('V6.1', STEREO_TOPIC, STEERING, StereoRoi(), EdgeDetector(),
+                   IntegralIntersection(RandomChooser(), front=FrontBox(1/3, 2/3, 0.5, 200, 1000)),
+                   HoughLineExtractor())
+
+
+def v6_2():
+    # front box: from 43% of the frame height down, columns 540..740, i.e. the last 100 columns of the left eye
+    # and the first 100 of the right eye (the box straddles the seam), open with less than ~1960 white pixels
+    return Profile('V6.2', STEREO_TOPIC, STEERING, StereoRoi(), EdgeDetector(),
+                   IntegralIntersection(HistoryChooser(), front=FrontBox(0.43, None, 0.25, 100, 500000)),
+                   HoughLineExtractor())
+
+
+def v7():
+    return Profile('V7', STEREO_TOPIC, STEERING, StereoRoi(), EdgeDetector(),
+                   IntegralIntersection(BalancedChooser()),
+                   HoughLineExtractor())
+
+
+PROFILES = {
+    'V4': v4,
+    'V5': v5,
+    'V6': v6,
+    'V6.1': v6_1,
+    'V6.2': v6_2,
+    'V7': v7,
+}
+
+
+# Line extractors that compute a CTE (the V4/V5 extractor computes their "direction" instead)
+LINE_EXTRACTORS = {
+    'hough': HoughLineExtractor,
+    'sliding_window': SlidingWindowExtractor,
+}
+
+
+def get_profile(name, lines=None, tracking=False, levels=0, refine=False, birdseye=False, split=False, normalize=False):
+    if name not in PROFILES:
+        raise ValueError("unknown lane detection profile '%s' (one of %s)" % (name, ", ".join(PROFILES)))
+    profile = PROFILES[name]()
+
+    if lines:
+        if lines not in LINE_EXTRACTORS:
+            raise ValueError("unknown line extractor '%s' (one of %s)" % (lines, ", ".join(LINE_EXTRACTORS)))
+        if profile.output != STEERING:
+            raise ValueError("profile %s publishes a lane direction, not a CTE: its line extractor cannot be replaced"
+                             % name)
+        profile.lines = LINE_EXTRACTORS[lines]()
+
+    if birdseye:
+        if profile.output != STEERING:
+            raise ValueError("profile %s publishes a lane direction, not a CTE: it has no bird's-eye mode" % name)
+        if lines or tracking or refine:
+            raise ValueError("the bird's-eye mode has its own line extractor (no lines, tracking or refine)")
+        profile.lines = BirdsEyeExtractor()
+
+    if tracking:
+        if profile.output != STEERING:
+            raise ValueError("profile %s publishes a lane direction, not a CTE: its lane markings cannot be tracked"
+                             % name)
+        profile.lines = LaneTracker(profile.lines)
+
+    if levels or refine:
+        if profile.output != STEERING:
+            raise ValueError("profile %s publishes a lane direction in image coordinates: it cannot run at a smaller "
+                             "scale" % name)
+        if levels not in (1, 2):
+            raise ValueError("levels must be 1 (1/2 scale) or 2 (1/4 scale), got %s" % levels)
+        profile.levels = levels
+        profile.lines = profile.lines.scaled(2**levels)
+        profile.refiner = BandRefiner() if refine else None
+
+    if split:
+        if profile.output != STEERING:
+            raise ValueError("profile %s publishes a lane direction, not a CTE: it cannot be split in halves" % name)
+        if tracking or birdseye:
+            raise ValueError("the split mode fits each half on its own (no tracking or bird's-eye mode)")
+        profile.split = HalfSplitter()
+
+    if normalize:
+        profile.normalizer = GammaNormalizer()
+    return profile
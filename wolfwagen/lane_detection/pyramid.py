@@ -0,0 +1,78 @@
+import cv2 as cv
+import numpy as np
+
+from .lines import LaneLines
+
+# Multi-resolution mode: edges and lines are computed on a pyrDown'd ROI ('levels' times, so 1/2 or 1/4 scale),
+# and the result is mapped back to full-resolution coordinates. Optionally, the lines are refined at full
+# resolution with the marking pixels within a narrow band around them.
+
+
+def pyr_down(img, levels):
+    for _ in range(levels):
+        img = cv.pyrDown(img)
+    return img
+
+
+def upscale(lanes, scale, shape):
+    # LaneLines of the pyrDown'd ROI -> LaneLines of the full-resolution ROI of the given shape
+    full = LaneLines(lanes.cte, height=shape[0], center=int(shape[1]/2))
+    full.offset = lanes.offset
+    full.curvature = lanes.curvature
+    if lanes.segments is not None:
+        full.segments = lanes.segments * scale
+    if lanes.left is not None:
+        full.left = (lanes.left[0] * scale, lanes.left[1] * scale)
+    if lanes.right is not None:
+        full.right = (lanes.right[0] * scale, lanes.right[1] * scale)
+
+    if full.left is not None and full.right is not None:
+        # otherwise the CTE is 0 or +-missing_cte, which does not depend on the resolution
+        full.cte = full.center - (full.right[0] + full.left[0])/2
+    return full
+
+
+class BandRefiner:
+    # Refits each line to the full-resolution marking pixels (gray > threshold) within +-band pixels of it.
+    # Only the 2*band+1 pixels around the line in each row are looked at, not the whole ROI
+
+    def __init__(self, band=12, threshold=160, min_pixels=50):
+        self.band = band
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+
+    def refine(self, gray, lanes):
+        height, width = gray.shape
+        rows = np.arange(height)
+        offsets = np.arange(-self.band, self.band + 1)
+        for side in ("left", "right"):
+            lane = getattr(lanes, side)
+            if lane is None:
+                continue
+            x_bottom, x_top = lane
+
+            # columns of the band in each row (x of the line +- band)
+            line_x = np.rint(x_top + (x_bottom - x_top) * rows / height).astype(int)
+            cols = line_x[:, None] + offsets
+            inside = (cols >= 0) & (cols < width)
+            band = gray[rows[:, None], np.clip(cols, 0, width - 1)]
+
+            ys, xs = np.nonzero((band > self.threshold) & inside)
+            if len(xs) < self.min_pixels:
+                continue
+
+            # 1D fitting (x as a function of y), least squares in closed form (much cheaper than np.polyfit)
+            xs = cols[ys, xs].astype(np.float64)
+            ys = ys.astype(np.float64)
+            y_mean = ys.mean()
+            x_mean = xs.mean()
+            dy = ys - y_mean
+            var = np.dot(dy, dy)
+            if var == 0:
+                continue
+            slope = np.dot(dy, xs - x_mean) / var
+            setattr(lanes, side, (int(x_mean + slope*(height - y_mean)), int(x_mean - slope*y_mean)))
+
+        if lanes.left is not None and lanes.right is not None:
+            lanes.cte = lanes.center - (lanes.right[0] + lanes.left[0])/2
+        return lanes
@@ -0,0 +1,46 @@
+import numpy as np
+
+# ROI strategies: crop(frame) returns the part of the (color) camera frame the lane detection works on.
+
+
+def stereo_roi(image, width, rows, cols=slice(None)):
+    # Assume: image is a stereo image (=left cam + right cam) from the zed camera
+    # The middle of the image (center-cut_width : center+cut_width) is not used, so
+    # 'cols' is given in the coordinates of the image with the middle removed.
+    # Returns the left-eye and/or right-eye part of image[rows, cols] as views (nothing is copied)
+    center = int(width/2)
+    cut_width = int(width/4)
+    seam = center - cut_width   # where the left-eye part ends
+    start, stop, _ = cols.indices(width - 2*cut_width)
+
+    views = []
+    if start < seam:
+        views.append(image[rows, start:min(stop, seam)])
+    if stop > seam:
+        views.append(image[rows, max(start, seam) + 2*cut_width:stop + 2*cut_width])
+    return views
+
+
+def stitch(views):
+    # A single view is returned as it is. Otherwise only the selected pixels are copied (not the whole frame)
+    if len(views) == 1:
+        return views[0]
+    return np.concatenate(views, axis=1)
+
+
+class StereoRoi:
+    # Bottom half of the stereo image, without the middle half (V6+)
+
+    def crop(self, frame):
+        height, width = frame.shape[:2]
+        return stitch(stereo_roi(frame, width, slice(int(height/2), height-1)))
+
+
+class BottomRoi:
+    # Rows top : height-1 of the mono camera image (V4/V5)
+
+    def __init__(self, top=360):
+        self.top = top
+
+    def crop(self, frame):
+        return frame[self.top:frame.shape[0]-1]
@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+import numpy as np
+
+# number of frames the percentiles are computed over
+WINDOW = 200
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    # Per-stage latency of a processing pipeline (e.g. process_img).
+    #
+    #   timer.start()
+    #   img = cv.GaussianBlur(...)
+    #   timer.mark("GaussianBlur")     # time since start() or the previous mark()
+    #   ...
+    #   timer.end()                    # once per frame
+    #
+    # A stage can be marked several times in one frame (e.g. "overlay" when drawing is spread over the code),
+    # the times are added up and recorded when end() is called. When disabled, every call returns right away.
+
+    def __init__(self, enabled=True, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}   # stage -> deque of the last 'window' times (in seconds)
+        self.frame = {}     # stage -> time in the current frame
+        self.frame_start = None
+        self.last = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.last = time.perf_counter()
+        if self.frame_start is None:
+            self.frame_start = self.last
+
+    def mark(self, stage):
+        if not self.enabled or self.last is None:
+            return
+        now = time.perf_counter()
+        self.frame[stage] = self.frame.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+    def end(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        self.frame["total"] = time.perf_counter() - self.frame_start
+        for stage, t in self.frame.items():
+            if stage not in self.samples:
+                self.samples[stage] = deque(maxlen=self.window)
+            self.samples[stage].append(t)
+        self.frame = {}
+        self.frame_start = None
+        self.last = None
+
+    def percentiles(self):
+        # stage -> (p50, p95, p99) in milliseconds
+        return {stage: tuple(np.percentile(np.array(t) * 1000.0, PERCENTILES))
+                for stage, t in self.samples.items() if len(t) > 0}
+
+    def to_diagnostic_array(self, name, stamp=None):
+        # DiagnosticArray for the /diagnostics topic (e.g. rqt_runtime_monitor).
+        # Imported here so that the timer itself can be used without ROS (offline benchmarks)
+        from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = name
+        status.message = "stage latency (ms) over the last %d frames" % self.window
+        for stage, p in self.percentiles().items():
+            for q, v in zip(PERCENTILES, p):
+                status.values.append(KeyValue(key="%s p%d" % (stage, q), value="%.2f" % v))
+
+        array = DiagnosticArray()
+        if stamp is not None:
+            array.header.stamp = stamp
+        array.status.append(status)
+        return array
@@ -0,0 +1,125 @@
+import logging
+
+import cv2 as cv
+import numpy as np
+
+from .lines import cross_track_error
+
+log = logging.getLogger(__name__)
+
+# Temporal lane tracking: the left and right markings are followed from frame to frame,
+# so the line search only looks at a band around where they are expected.
+
+
+class LineTrack:
+    # Kalman filter over the <slope, intercept> of one marking, x = slope*y + intercept in ROI coordinates
+    # (intercept: x at the top of the ROI). The markings move slowly, so the motion model is "no change" + noise
+
+    def __init__(self, measurement, process_noise, measurement_noise):
+        self.state = np.array(measurement, dtype=np.float64)
+        self.Q = np.diag(process_noise)
+        self.R = np.diag(measurement_noise)
+        self.P = self.R.copy()
+        self.misses = 0     # number of frames in a row without a measurement
+
+    def predict(self):
+        self.P = self.P + self.Q
+
+    def update(self, measurement):
+        K = self.P @ np.linalg.inv(self.P + self.R)
+        self.state = self.state + K @ (np.asarray(measurement, dtype=np.float64) - self.state)
+        self.P = (np.eye(2) - K) @ self.P
+        self.misses = 0
+
+    def x_at(self, y):
+        return self.state[0]*y + self.state[1]
+
+
+def to_slope_intercept(lane, height):
+    # (x at the bottom, x at the top) -> (slope, intercept)
+    x_bottom, x_top = lane
+    return ((x_bottom - x_top)/height, x_top)
+
+
+class LaneTracker:
+    # Line extractor wrapping another one (Hough or sliding window) with a LineTrack per marking.
+    # While both markings are tracked, the line search of the wrapped extractor only sees the edge / binary pixels
+    # within +-band pixels of the predicted lines. A measurement further than 'gate' pixels from the prediction
+    # is ignored, and a marking that is not found for max_misses frames is dropped; if a marking is not
+    # tracked, the whole ROI is searched again.
+    # The reported lanes are the filtered lines, so a marking missing in a few frames does not make the CTE jump
+    # to +-missing_cte (the predicted line is used instead)
+
+    def __init__(self, lines, band=40, gate=80, max_misses=5, missing_cte=500,
+                 process_noise=(0.02**2, 10.0**2), measurement_noise=(0.05**2, 15.0**2)):
+        self.lines = lines
+        self.band = band
+        self.gate = gate
+        self.max_misses = max_misses
+        self.missing_cte = missing_cte
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.tracks = {"left": None, "right": None}
+
+    def scaled(self, scale):
+        # the same tracker for an image 'scale' times smaller (pyramid mode)
+        return LaneTracker(self.lines.scaled(scale), self.band/scale, self.gate/scale, self.max_misses,
+                           self.missing_cte,
+                           (self.process_noise[0], self.process_noise[1]/scale**2),
+                           (self.measurement_noise[0], self.measurement_noise[1]/scale**2))
+
+    def reset(self):
+        # e.g. after a turn: the markings will not be where they were
+        self.tracks = {"left": None, "right": None}
+
+    def band_mask(self, shape):
+        # 255 within +-band pixels of the predicted lines
+        height = shape[0]
+        mask = np.zeros(shape, dtype=np.uint8)
+        for track in self.tracks.values():
+            x_bottom = track.x_at(height)
+            x_top = track.x_at(0)
+            vertices = np.array([[(x_bottom - self.band, height), (x_top - self.band, 0),
+                                  (x_top + self.band, 0), (x_bottom + self.band, height)]], dtype=np.int32)
+            cv.fillPoly(mask, vertices, 255)
+        return mask
+
+    def extract(self, binary, edge, timer):
+        height = edge.shape[0]
+        for track in self.tracks.values():
+            if track is not None:
+                track.predict()
+
+        if all(self.tracks.values()):
+            # only search around the predicted lines
+            mask = self.band_mask(edge.shape)
+            binary = cv.bitwise_and(binary, mask)
+            edge = cv.bitwise_and(edge, mask)
+            timer.mark("band")
+
+        lanes = self.lines.extract(binary, edge, timer)
+
+        for side, track in self.tracks.items():
+            lane = getattr(lanes, side)
+            if lane is not None:
+                measurement = to_slope_intercept(lane, height)
+                if track is None:
+                    self.tracks[side] = LineTrack(measurement, self.process_noise, self.measurement_noise)
+                    continue
+                if abs(track.x_at(height) - lane[0]) < self.gate and abs(track.x_at(0) - lane[1]) < self.gate:
+                    track.update(measurement)
+                    continue
+
+            if track is not None:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    log.info("lost the %s lane marking", side)
+                    self.tracks[side] = None
+
+        for side, track in self.tracks.items():
+            setattr(lanes, side, None if track is None else (int(track.x_at(height)), int(track.x_at(0))))
+        if lanes.segments is None and any(self.tracks.values()):
+            lanes.segments = np.empty((0, 4), dtype=int)
+        lanes.cte = cross_track_error(lanes, self.missing_cte)
+        timer.mark("tracking")
+        return lanes
@@ -0,0 +1,90 @@
+import logging
+import math
+import threading
+
+from .intersection import LEFT, RIGHT, STRAIGHT, DIRECTION_NAMES
+
+log = logging.getLogger(__name__)
+
+# Turns at intersections, driven by the pose (not by the camera frames): the node calls start() when the lane
+# detection decides to turn, and update() from every pose callback, so the turn ends as soon as the yaw is
+# within 'tolerance' of the target instead of at the next processed frame.
+#
+#   turn = TurnController(publish)           # publish(steering): sends a steering command
+#   turn.start(LEFT, yaw, now)               # publishes the steering command to hold during the turn
+#   turn.hold()                              # publishes it again (every frame, like before), False if not turning
+#   turn.update(yaw, now)                    # True if the turn just ended (target reached or 'timeout'), then
+#                                            # end_command was published
+#   turn.active()                            # False once the turn ended
+#
+# The commands are published under the lock of the controller, so the start command of a turn that the pose
+# callback ends right away (e.g. STRAIGHT) cannot go out after its end command.
+
+# steering command held during a turn
+TURN_COMMANDS = {LEFT: -100, RIGHT: +100, STRAIGHT: 0}
+
+# yaw change of a turn (degrees, counterclockwise): left turn -> yaw increases, right turn -> yaw decreases
+TURN_ANGLES = {LEFT: 90.0, RIGHT: -90.0, STRAIGHT: 0.0}
+
+
+def yaw_from_quaternion(quat):
+    # Yaw (rotation around z, counterclockwise) in degrees, in [0, 360)
+    t3 = +2.0 * (quat.w * quat.z + quat.x * quat.y)
+    t4 = +1.0 - 2.0 * (quat.y * quat.y + quat.z * quat.z)
+    return math.degrees(math.atan2(t3, t4)) % 360.0
+
+
+def yaw_difference(a, b):
+    # Smallest angle between two yaws in degrees (0..180)
+    d = abs(a - b) % 360.0
+    return min(d, 360.0 - d)
+
+
+class TurnController:
+    # start() and hold() are called from the main loop, update() from the pose callbacks (another thread) and the
+    # main loop, hence the lock
+
+    def __init__(self, publish, tolerance=10.0, timeout=2.0, end_command=0):
+        self.publish = publish
+        self.tolerance = tolerance      # degrees
+        self.timeout = timeout          # seconds
+        self.end_command = end_command  # published when the target is reached, until the lane following takes over
+        self.lock = threading.Lock()
+        self.direction = None           # direction of the turn in progress, None when not turning
+        self.target = 0.0
+        self.start_time = 0.0
+
+    def start(self, direction, yaw, now):
+        if direction not in TURN_COMMANDS:
+            raise ValueError("cannot turn %r" % direction)
+        with self.lock:
+            self.direction = direction
+            self.target = (yaw + TURN_ANGLES[direction]) % 360.0
+            self.start_time = now
+            self.publish(TURN_COMMANDS[direction])
+        log.info("turning %s: yaw %.1f -> %.1f", DIRECTION_NAMES[direction], yaw, self.target)
+
+    def hold(self):
+        with self.lock:
+            if self.direction is None:
+                return False
+            self.publish(TURN_COMMANDS[self.direction])
+            return True
+
+    def update(self, yaw, now):
+        with self.lock:
+            if self.direction is None:
+                return False
+            if now - self.start_time > self.timeout:
+                log.info("turn timed out (yaw %.1f, target %.1f)", yaw, self.target)
+            elif yaw_difference(yaw, self.target) < self.tolerance:
+                log.info("Turning is done (%.2f s)", now - self.start_time)
+            else:
+                return False
+            self.direction = None
+            self.publish(self.end_command)
+            return True
+
+    def active(self):
+        with self.lock:
+            return self.direction is not None
@@ -0,0 +1,293 @@
+import logging
+import threading
+import time
+
+import cv2 as cv
+import rclpy    # Python Client Library for ROS 2
+from rclpy.node import Node     # Handles the creation of nodes
+from sensor_msgs.msg import Image   # Image is the message type
+from std_msgs.msg import Int64, Int64MultiArray
+from cv_bridge import CvBridge  # Package to convert between ROS and OpenCV Images
+from geometry_msgs.msg import PoseStamped
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus
+from frame_hub import SharedFrames, frame_valid
+from image_msg import decode_image
+from latency import TRACE_TOPIC, now_ns, stamp_to_ns, trace_msg
+from node_log import setup_logging
+from pid import PID
+from qos import SENSOR, COMMAND, EVENT, IMAGE
+
+from lane_detection.detector import LaneDetector
+from lane_detection.intersection import LEFT, RIGHT, STRAIGHT
+from lane_detection.profiles import get_profile, STEERING
+from lane_detection.roi import StereoRoi
+from lane_detection.stage_timer import StageTimer
+from lane_detection.turning import TurnController, yaw_from_quaternion
+
+# Lane following node (detection + PID) running one of the profiles in lane_detection/profiles.py.
+# The profile is chosen by the launcher script (LaneDetectionV*.py) or with --ros-args -p profile:=V6.1,
+# and its line extractor can be replaced with --ros-args -p lines:=sliding_window (see LINE_EXTRACTORS)
+# -p tracking:=true tracks the lane markings from frame to frame (see lane_detection/tracking.py)
+# -p levels:=1 (or 2) runs the edge and line detection at 1/2 (or 1/4) scale, -p refine:=true refines the
+# lines at full scale (see lane_detection/pyramid.py)
+# -p birdseye:=true fits the lanes in a top-down view, in meters (see lane_detection/birdseye.py)
+# -p split:=true processes the left and right halves of the ROI on two threads (see lane_detection/parallel.py)
+# -p normalize:=true corrects the brightness (gamma) of the ROI before the thresholding (see lane_detection/edges.py)
+# -p shared_frames:=true reads the frames from the shared memory of frame_hub.py
+
+log = logging.getLogger("Lane_detection_node")
+
+# Set it to 'False' when driving (True when debugging)
+SHOW_IMAGES = False
+
+# Per-stage latency of the lane detection, published on /diagnostics once per second (no overhead when False)
+TIMING = True
+
+DRAW_LINE_IMG = True
+
+# The lane image is only built when someone subscribes to 'lane_img', and at most LANE_IMG_FREQ times per second
+LANE_IMG_FREQ = 5
+
+# True: process each frame as soon as it arrives. False: poll for new frames at FREQ (old behavior)
+EVENT_DRIVEN = True
+
+br = CvBridge()
+
+
+def stamp_to_sec(stamp):
+    return stamp.sec + stamp.nanosec * 1e-9
+
+
+class LaneDetectionNode(Node):
+    # Lane following node. frames: FrameHub of the process (see composition.py) when the node shares the camera
+    # subscription with the other nodes of the process, SharedFrames (see frame_hub.py) to read the frames from
+    # the frame hub, None: the node subscribes to the camera topic itself.
+    # run() is the main loop (it returns when the camera stops publishing)
+
+    def __init__(self, profile='V6', frames=None):
+        super().__init__("Lane_detection_node")
+        self.profile = get_profile(self.declare_parameter('profile', profile).value,
+                                   self.declare_parameter('lines', '').value,
+                                   self.declare_parameter('tracking', False).value,
+                                   self.declare_parameter('levels', 0).value,
+                                   self.declare_parameter('refine', False).value,
+                                   self.declare_parameter('birdseye', False).value,
+                                   self.declare_parameter('split', False).value,
+                                   self.declare_parameter('normalize', False).value)
+        log.info("Lane_detection_node %s", self.profile.name)
+
+        self.stage_timer = StageTimer(TIMING)
+        self.detector = LaneDetector(self.profile, self.stage_timer)
+
+        # Latest frame (mailbox): (sequence number, header stamp in seconds, image message, time received in ns)
+        # The message is decoded only when the main loop uses it (see decode_image), so frames we never process
+        # cost nothing here.
+        # The sequence number increases by one for every received frame, so the main loop can tell a new frame from
+        # the one it already processed.
+        # The whole tuple is replaced at once, so the main loop never sees the image of one frame with the stamp of
+        # another
+        self.latest_frame = None
+        self.frame_seq = 0
+        self.last_frame_time = time.time()
+        self.new_frame = threading.Event()   # set when a frame arrives
+        self.pose = None
+        self.yaw = 0.0      # of the last pose, in degrees
+        # turns at intersections (see lane_detection/turning.py), it publishes the steering commands of the turns
+        self.turn = TurnController(self.publish_steering)
+
+        if frames is None and self.declare_parameter('shared_frames', False).value:
+            frames = SharedFrames(self)
+        if frames is not None:
+            frames.subscribe(self.profile.camera_topic, self.listener_callback)
+        else:
+            self.create_subscription(Image, self.profile.camera_topic, self.listener_callback, SENSOR)
+
+        self.pose_subscription = None
+        if self.profile.output == STEERING:
+            self.pose_subscription = self.create_subscription(PoseStamped, "/zed2i/zed_node/pose", self.pose_callback,
+                                                              SENSOR)
+            self.pid_steering_publisher = self.create_publisher(Int64, 'pid_steering', COMMAND)
+            # camera image -> steering command latency (see latency.py)
+            self.trace_publisher = self.create_publisher(Int64MultiArray, TRACE_TOPIC, COMMAND)
+        else:
+            self.lane_publisher = self.create_publisher(Int64, 'lane', COMMAND)
+
+        # IntersectionEvent (see lane_detection/intersection.py) of every intersection decision
+        self.intersection_publisher = self.create_publisher(DiagnosticStatus, 'intersection', EVENT)
+        self.lane_img_publisher = self.create_publisher(Image, 'lane_img', IMAGE)
+        self.diagnostics_publisher = self.create_publisher(DiagnosticArray, '/diagnostics', COMMAND)
+
+    def listener_callback(self, msg):
+        self.frame_seq += 1
+        self.latest_frame = (self.frame_seq, stamp_to_sec(msg.header.stamp), msg, now_ns())
+        self.last_frame_time = time.time()
+        self.new_frame.set()
+
+    def pose_callback(self, data):
+        self.pose = data
+        self.yaw = yaw_from_quaternion(data.pose.orientation)
+
+        # Turns end here, at the rate of the pose, instead of at the next processed frame
+        if self.turn.update(self.yaw, time.time()):
+            self.new_frame.set()    # back to lane following with the next frame
+
+    def publish_steering(self, steering_cmd):
+        m = Int64()
+        m.data = int(steering_cmd)
+        self.pid_steering_publisher.publish(m)
+
+    def wait_for_next_frame(self, rate, timeout):
+        # Event-driven: return as soon as a new frame arrives (or after timeout), instead of waiting for the next
+        # rate tick
+        if EVENT_DRIVEN:
+            self.new_frame.wait(timeout)
+            self.new_frame.clear()
+        else:
+            rate.sleep()
+
+    def run(self):
+        FREQ = 20
+        rate = self.create_rate(FREQ, self.get_clock())
+
+        # For PID control (dt from the frame stamps, see pid.py). The driver takes steering commands in [-100, 100]
+        Kp = 0.15
+        Ki = 0.0
+        Kd = 0.01
+        pid = PID(Kp, Ki, Kd, output_limits=(-100, 100), default_dt=1/float(FREQ))
+
+        last_lane_img_time = 0
+        last_timing_time = time.time()
+
+        turning = False     # Am i making a turn (left, right or straight)? The turn itself is in self.turn
+
+        last_seq = 0    # sequence number of the last processed frame
+
+        while rclpy.ok():
+            if self.latest_frame is not None and (self.pose is not None or self.pose_subscription is None):
+                if time.time() - self.last_frame_time > 3:
+                    log.error("NOT RECEIVING CAMERA DATA. ")
+                    break
+
+                seq, stamp, frame_msg, received = self.latest_frame
+                if seq == last_seq:
+                    # No new frame since the last tick. Don't process the same frame again
+                    self.wait_for_next_frame(rate, 1.0)
+                    continue
+                last_seq = seq
+                started = now_ns()
+                frame = decode_image(frame_msg)
+                if frame is None:
+                    log.info("frame %d dropped, the frame hub restarted", seq)
+                    continue
+
+                # The lane image is only built if someone is watching, so the control path never pays for it
+                publish_lane_img = (self.lane_img_publisher.get_subscription_count() > 0
+                                    and time.time() - last_lane_img_time >= 1.0/LANE_IMG_FREQ)
+                show_lane_img = publish_lane_img or SHOW_IMAGES
+
+                if self.pose_subscription is None:
+                    # V4/V5: publish the "direction" of every frame, the steering is done by another node
+                    result = self.detector.process(frame, DRAW_LINE_IMG and show_lane_img)
+                    self.stage_timer.end()
+                    if not frame_valid(frame_msg):
+                        log.debug("frame %d overwritten in the frame ring while it was processed, dropped", seq)
+                        continue
+                    final_image = result.image
+                    if result.cte is not None:
+                        m = Int64()
+                        m.data = int(result.cte)
+                        self.lane_publisher.publish(m)
+                        log.debug("THIS IS THE DIRECTION: %d", result.cte)
+
+                else:
+                    log.debug('yaw_now = %.1f', self.yaw)
+
+                    if turning:
+                        # the turn ends in pose_callback, or here if it timed out while no pose arrived.
+                        # Until then the turn command is published again with every frame
+                        self.turn.update(self.yaw, time.time())
+                        if not self.turn.hold():
+                            # the turn ended: back to lane following
+                            turning = False
+                            pid.reset()
+
+                    steering_cmd = None
+                    if turning:
+                        # The turn controller steers (see pose_callback)
+                        # just for streaming camera data -- nothing more
+                        final_image = None
+                        if show_lane_img:
+                            final_image = StereoRoi().crop(frame)
+
+                    else:
+                        # Not in the turning mode
+                        # Check if we need to start a turning or not
+
+                        result = self.detector.process(frame, DRAW_LINE_IMG and show_lane_img)
+                        self.stage_timer.end()
+                        if not frame_valid(frame_msg):
+                            log.debug("frame %d overwritten in the frame ring while it was processed, dropped", seq)
+                            continue
+                        final_image, CTE, turning_direction = result.image, result.cte, result.turn
+                        if result.intersection is not None:
+                            self.intersection_publisher.publish(result.intersection.to_msg())
+
+                        if turning_direction in (LEFT, RIGHT, STRAIGHT):
+                            # now we start making a turn: the steering is held until the yaw reaches the target
+                            # (the turn controller publishes the command)
+                            turning = True
+                            self.turn.start(turning_direction, self.yaw, time.time())
+
+                        else:
+                            # Straight
+                            # PID control
+                            setpoint = 0    # always want to stay on the center line
+                            error = setpoint - CTE
+                            steering_cmd = pid.update(error, stamp)
+
+                            log.debug("CTE= %s", CTE)
+
+                    if steering_cmd is not None:
+                        # publish steering command (as soon as it is ready)
+                        self.publish_steering(steering_cmd)
+                        self.trace_publisher.publish(trace_msg(steering_cmd, stamp_to_ns(frame_msg.header.stamp),
+                                                               received, started, now_ns()))
+
+                        log.debug("steering_cmd = %d", steering_cmd)
+
+                if SHOW_IMAGES and final_image is not None:
+                    cv.imshow('Lane following', final_image)
+                    cv.waitKey(1)
+
+                if TIMING and time.time() - last_timing_time >= 1.0:
+                    self.diagnostics_publisher.publish(self.stage_timer.to_diagnostic_array(
+                        "Lane_detection_node: process_img", self.get_clock().now().to_msg()))
+                    last_timing_time = time.time()
+
+                # Lane image for rviz2 or webviz
+                if publish_lane_img and final_image is not None:
+                    H, W = final_image.shape[:2]
+                    smaller_dim = (int(W*0.2), int(H*0.2))
+                    final_image = cv.resize(final_image, smaller_dim)
+                    img_msg = br.cv2_to_imgmsg(final_image, encoding="bgra8")
+                    self.lane_img_publisher.publish(img_msg)
+                    last_lane_img_time = time.time()
+
+            self.wait_for_next_frame(rate, 1.0)
+
+
+def main(args=None, profile='V6'):
+    setup_logging()
+    rclpy.init(args=args)
+    node = LaneDetectionNode(profile)
+
+    thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
+    thread.start()
+
+    node.run()
+
+    # Destroy the node explicitly
+    # (optional - otherwise it will be done automatically
+    # when the garbage collector destroys the node object)
+    node.destroy_node()
+    rclpy.shutdown()
@@ -0,0 +1,105 @@
+import time
+from collections import deque
+
+import numpy as np
+
+# End-to-end latency of the steering: from the camera image to the write to the Teensy.
+#
+# The trace ID of a steering command is the header stamp of the camera image it was computed from. The lane
+# detection node publishes, next to pid_steering, a trace on pid_steering_trace (std_msgs/Int64MultiArray):
+#   [steering, image stamp, received, started, published]     (times in ns, system clock like the ZED stamps)
+# The driver (pwm_genV3.5.py) adds when the trace arrived and when the serial writer (teensy_link.py) wrote the
+# command to the port (commands that are not written, e.g. unchanged, have no trace), and
+# keeps the latency of every hop (HOPS) over the last 'window' commands. It publishes the percentiles and a
+# histogram of each hop on /diagnostics (status "<node>: latency"); ./latency_report.py prints them.
+
+TRACE_TOPIC = 'pid_steering_trace'
+
+# hop: (from, to) trace fields
+HOPS = {
+    'camera': ('stamp', 'received'),        # ZED capture -> lane detection node (ZED SDK + ROS transport)
+    'queue': ('received', 'started'),       # waiting in the mailbox of the lane detection node
+    'process': ('started', 'published'),    # process_img + PID
+    'transport': ('published', 'arrived'),  # pid_steering_trace -> driver
+    'driver': ('arrived', 'written'),       # driver loop + serial writer thread, until the frame is on the port
+    'total': ('stamp', 'written'),
+}
+
+FIELDS = ('steering', 'stamp', 'received', 'started', 'published', 'arrived', 'written')
+
+# upper bounds (ms) of the histogram buckets, the last bucket is everything above
+BUCKETS = (5, 10, 20, 35, 50, 75, 100, 150, 200, 300)
+
+PERCENTILES = (50, 95, 99)
+
+WINDOW = 500
+
+
+def now_ns():
+    return time.time_ns()
+
+
+def stamp_to_ns(stamp):
+    return stamp.sec * 1000000000 + stamp.nanosec
+
+
+def trace_msg(steering, stamp, received, started, published):
+    from std_msgs.msg import Int64MultiArray
+
+    m = Int64MultiArray()
+    m.data = [int(steering), stamp, received, started, published]
+    return m
+
+
+def bucket_labels():
+    bounds = (0,) + BUCKETS
+    return ["%d-%d" % (lo, hi) for lo, hi in zip(bounds, BUCKETS)] + [">%d" % BUCKETS[-1]]
+
+
+class LatencyTracer:
+    # Latency per hop of the last 'window' traces.
+    #
+    #   tracer.record(trace)     # trace: field -> time in ns (FIELDS), once per steering command written
+    #   tracer.percentiles()     # hop -> (p50, p95, p99, max) in ms
+    #   tracer.histograms()      # hop -> number of traces in each bucket (BUCKETS)
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {hop: deque(maxlen=window) for hop in HOPS}
+
+    def record(self, trace):
+        for hop, (start, end) in HOPS.items():
+            self.samples[hop].append((trace[end] - trace[start]) / 1e6)
+
+    def count(self):
+        return len(self.samples['total'])
+
+    def percentiles(self):
+        return {hop: tuple(np.percentile(t, PERCENTILES)) + (max(t),) for hop, t in self.samples.items() if len(t) > 0}
+
+    def histograms(self):
+        return {hop: np.bincount(np.searchsorted(BUCKETS, t), minlength=len(BUCKETS) + 1)
+                for hop, t in self.samples.items() if len(t) > 0}
+
+    def to_diagnostic_array(self, name, stamp=None):
+        # DiagnosticArray for /diagnostics: "<hop> p50/p95/p99/max" and "<hop> histogram" (counts per bucket,
+        # the bucket bounds are in the message). Imported here so that the tracer can be used without ROS
+        from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = name
+        status.message = "latency (ms) of the last %d steering commands, buckets: %s" % (
+            self.count(), " ".join(bucket_labels()))
+        histograms = self.histograms()
+        for hop, p in self.percentiles().items():
+            for q, v in zip(PERCENTILES, p):
+                status.values.append(KeyValue(key="%s p%d" % (hop, q), value="%.1f" % v))
+            status.values.append(KeyValue(key="%s max" % hop, value="%.1f" % p[-1]))
+            status.values.append(KeyValue(key="%s histogram" % hop, value=" ".join(str(n) for n in histograms[hop])))
+
+        array = DiagnosticArray()
+        if stamp is not None:
+            array.header.stamp = stamp
+        array.status.append(status)
+        return array
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Prints the camera image -> Teensy latency breakdown published by the driver on /diagnostics (see latency.py)
+#
+#   ./latency_report.py            # one report per latency status received (the driver publishes one per second)
+#   ./latency_report.py --once
+import argparse
+import sys
+
+import rclpy
+from diagnostic_msgs.msg import DiagnosticArray
+from rclpy.node import Node
+from rclpy.utilities import remove_ros_args
+
+from latency import BUCKETS, HOPS, PERCENTILES, bucket_labels
+from qos import SENSOR
+
+BAR_WIDTH = 30
+
+
+def format_status(status):
+    values = {kv.key: kv.value for kv in status.values}
+    lines = [status.name, "  " + status.message.split(",")[0], ""]
+    lines.append("  %-10s" % "hop" + "".join("%8s" % ("p%d" % q) for q in PERCENTILES) + "%8s" % "max" + "  (ms)")
+    for hop in HOPS:
+        if "%s max" % hop not in values:
+            continue
+        p = [values["%s p%d" % (hop, q)] for q in PERCENTILES] + [values["%s max" % hop]]
+        lines.append("  %-10s" % hop + "".join("%8s" % v for v in p))
+
+    # histogram of the whole path
+    counts = [int(n) for n in values.get("total histogram", "").split()]
+    if len(counts) == len(BUCKETS) + 1 and sum(counts) > 0:
+        lines.append("")
+        lines.append("  total (ms)")
+        for label, n in zip(bucket_labels(), counts):
+            lines.append("  %8s %-*s %d" % (label, BAR_WIDTH, "#" * round(BAR_WIDTH * n / max(counts)), n))
+    return "\n".join(lines)
+
+
+class LatencyReport(Node):
+
+    def __init__(self, once):
+        super().__init__("latency_report")
+        self.once = once
+        self.done = False
+        self.create_subscription(DiagnosticArray, '/diagnostics', self.diagnostics_callback, SENSOR)
+
+    def diagnostics_callback(self, msg):
+        for status in msg.status:
+            if status.name.endswith(": latency"):
+                print(format_status(status) + "\n", flush=True)
+                self.done = self.once
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="camera image -> Teensy latency breakdown")
+    parser.add_argument("--once", action="store_true", help="print one report and exit")
+    opts = parser.parse_args(remove_ros_args(args if args is not None else sys.argv)[1:])
+
+    rclpy.init(args=args)
+    node = LatencyReport(opts.once)
+    try:
+        while rclpy.ok() and not node.done:
+            rclpy.spin_once(node)
+    except KeyboardInterrupt:
+        pass
+    node.destroy_node()
+    rclpy.try_shutdown()
+
+
+if __name__ == '__main__':
+    main()
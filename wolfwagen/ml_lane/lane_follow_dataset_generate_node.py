@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Image
@@ -7,11 +8,20 @@ from std_msgs.msg import Int64
 import cv2 as cv
 import numpy as np
 import pandas as pd
-from cv_bridge import CvBridge
 import threading
 import time
 import tensorflow as tf
 keras = tf.keras
+import os
+import sys
+# node_log, qos and frame_hub are in the parent directory (wolfwagen/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_hub import SharedFrames, frame_valid
+from image_msg import decode_image
+from node_log import setup_logging
+from qos import SENSOR, COMMAND
+
+log = logging.getLogger("lane_follow_dataset_generate_node")
 
 DATA_SAVE_PATH = "lanefollow/data/"
 DATA_NAME_PRE = "img_"
@@ -20,8 +30,19 @@ DATA_FILE_EXTENSION = ".png"
 steering = 0
 file_idx = 0
 img = None
-bridge = CvBridge()
 new_supplied = False
+
+CAMERA_TOPIC = '/zed2i/zed_node/rgb_raw/image_raw_color'
+
+def encode(msg):
+    # msg: image message, or SharedFrame (the pixels are used in place). The image file, None if the frame was
+    # overwritten in the frame ring before it was encoded
+    image = decode_image(msg)
+    if image is None:
+        return None
+    _, data = cv.imencode(DATA_FILE_EXTENSION, image)
+    return data if frame_valid(msg) else None
+
 def save_dataset(dataset: pd.DataFrame):
     dataset.to_csv(DATA_SAVE_PATH + "meta.csv")
 
@@ -35,23 +56,28 @@ def steering_callback(msg: Int64 = None) -> None:
     steering = msg
 
 def main(args=None) -> None :
-    global img, steering, file_idx
+    global img, steering, file_idx, new_supplied
 
+    setup_logging()
     rclpy.init(args=args)
     node = Node("lane_image_dataset_generate_node")
 
-    node.create_subscription(
-        Image,
-        '/zed2i/zed_node/rgb_raw/image_raw_color',
-        zed_callback,
-        1
-    )
+    # -p shared_frames:=true reads the frames from frame_hub.py (shared memory) instead of the camera topic
+    if node.declare_parameter('shared_frames', False).value:
+        SharedFrames(node).subscribe(CAMERA_TOPIC, zed_callback)
+    else:
+        node.create_subscription(
+            Image,
+            CAMERA_TOPIC,
+            zed_callback,
+            SENSOR
+        )
 
     node.create_subscription(
         Int64,
         'pid_steering',
         steering_callback,
-        1
+        COMMAND
     )
 
     dataset: pd.DataFrame = pd.DataFrame(columns=["img", "steering"])
@@ -64,13 +90,19 @@ def main(args=None) -> None :
 
         while rclpy.ok() :
             if not new_supplied:
+                rate.sleep()
+                continue
+            new_supplied = False
+            data = encode(img)
+            if data is None:
+                log.debug("frame overwritten in the frame ring, dropped")
+                rate.sleep()
                 continue
             fname = DATA_NAME_PRE + str(file_idx) + DATA_FILE_EXTENSION
-            cv.imwrite(DATA_SAVE_PATH + fname, bridge.imgmsg_to_cv2(img))
+            data.tofile(DATA_SAVE_PATH + fname)
             row = pd.Series({"img": fname, "steering": steering.data})
             dataset = pd.concat([dataset, row.to_frame().T], ignore_index=True)
-            print(steering.data)
-            new_supplied = False
+            log.info("steering: %d", steering.data)
             file_idx += 1
             rate.sleep()
     
@@ -5,35 +5,55 @@ from std_msgs.msg import Int64
 import cv2 as cv
 import numpy as np
 # from matplotlib.pyplot import hsv
-from cv_bridge import CvBridge
 import threading
 import time
 import tensorflow as tf
 keras = tf.keras
+import os
+import sys
+# qos and frame_hub are in the parent directory (wolfwagen/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_hub import SharedFrames, frame_valid
+from image_msg import decode_image
+from qos import SENSOR
 
 DATA_SAVE_PATH = "data/img_"
 DATA_FILE_EXTENSION = ".png"
 
 file_idx = 0
 img = None
-bridge = CvBridge()
+
+CAMERA_TOPIC = '/zed2i/zed_node/rgb_raw/image_raw_color'
+
+def encode(msg):
+    # msg: image message, or SharedFrame (the pixels are used in place). The image file, None if the frame was
+    # overwritten in the frame ring before it was encoded
+    image = decode_image(msg)
+    if image is None:
+        return None
+    _, data = cv.imencode(DATA_FILE_EXTENSION, image)
+    return data if frame_valid(msg) else None
 
 def zed_callback(msg: Image = None) -> None :
     global img
     img = msg
 
 def main(args=None) -> None :
-    global img
+    global img, file_idx
 
     rclpy.init(args=args)
     node = Node("lane_image_dataset_generate_node")
 
-    node.create_subscription(
-        Image,
-        '/zed2i/zed_node/rgb_raw/image_raw_color',
-        zed_callback,
-        20
-    )
+    # -p shared_frames:=true reads the frames from frame_hub.py (shared memory) instead of the camera topic
+    if node.declare_parameter('shared_frames', False).value:
+        SharedFrames(node).subscribe(CAMERA_TOPIC, zed_callback)
+    else:
+        node.create_subscription(
+            Image,
+            CAMERA_TOPIC,
+            zed_callback,
+            SENSOR
+        )
 
     thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
     thread.start()
@@ -41,8 +61,11 @@ def main(args=None) -> None :
     rate = node.create_rate(1, node.get_clock())
 
     while rclpy.ok() :
-        cv.imwrite(DATA_SAVE_PATH + str(file_idx) + DATA_FILE_EXTENSION, bridge.imgmsg_to_cv2(img))
-        file_idx += 1
+        # no frame yet, or overwritten in the frame ring: take the next one
+        data = None if img is None else encode(img)
+        if data is not None:
+            data.tofile(DATA_SAVE_PATH + str(file_idx) + DATA_FILE_EXTENSION)
+            file_idx += 1
         rate.sleep()
     
     rclpy.shutdown()
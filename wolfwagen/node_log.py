@@ -0,0 +1,132 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import sys
+import threading
+from collections import deque
+
+# Logging for the nodes (instead of print() in the control loops), on top of the standard logging module.
+#
+#   import logging
+#   from node_log import setup_logging
+#   log = logging.getLogger("obstacle_detector")
+#   setup_logging()                  # once, in main()
+#   log.debug("min_dist = %f", d)    # per-iteration values: debug (not even formatted at the default level)
+#   log.info("turning direction: %d", direction)
+#
+# - The same message (logger + format string) is written at most once every 'period' seconds, with the number
+#   of times it was suppressed in between.
+# - Writing to stdout happens on a separate thread, so a slow terminal (e.g. over SSH) never blocks the loop.
+# - The last 'ring' records (including the suppressed ones) are kept in memory and written to stderr on SIGUSR1
+#   (kill -USR1 <pid>) or by calling dump().
+# - WOLFWAGEN_LOG=0 disables all of it: every log call returns right after a level check.
+#   WOLFWAGEN_LOG=debug writes the debug messages as well.
+#   WOLFWAGEN_LOG_RING=debug keeps the debug messages in the ring without writing them. Off by default: the
+#   debug calls of the per-frame loops would then create a record for every call.
+
+FORMAT = "%(asctime)s %(levelname).1s [%(name)s] %(message)s"
+
+ring = None     # RingBuffer of the process, set by setup_logging
+
+
+class RateLimit:
+    # Lets the same message (logger + format string) through at most once every 'period' seconds.
+    # The nodes log from the spin thread and from the main loop, hence the lock
+
+    def __init__(self, period=1.0):
+        self.period = period
+        self.last = {}  # (logger, format string) -> [time of the last record let through, records suppressed since]
+        self.lock = threading.Lock()
+
+    def check(self, record):
+        # None if the record is suppressed, else the number of records of the message suppressed before it
+        key = (record.name, record.msg)
+        now = record.created
+        with self.lock:
+            last = self.last.get(key)
+            if last is not None and now - last[0] < self.period:
+                last[1] += 1
+                return None
+            self.last[key] = [now, 0]
+        return 0 if last is None else last[1]
+
+
+class RateLimitedQueueHandler(logging.handlers.QueueHandler):
+    # QueueHandler with a RateLimit. The number of suppressed records ("... (x3)") is added to a copy of the
+    # record, the other handlers (the ring buffer) keep the record as it was logged
+
+    def __init__(self, queue, period=1.0):
+        super().__init__(queue)
+        self.rate_limit = RateLimit(period)
+
+    def handle(self, record):
+        suppressed = self.rate_limit.check(record)
+        if suppressed is None:
+            return False
+        if suppressed:
+            record = copy.copy(record)
+            record.msg = "%s (x%d)" % (record.msg, suppressed + 1)
+        return super().handle(record)
+
+
+class RingBuffer(logging.Handler):
+    # Keeps the last 'size' records (not formatted until dump() is called)
+
+    def __init__(self, size=1000, level=logging.DEBUG):
+        super().__init__(level)
+        self.records = deque(maxlen=size)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, stream=None):
+        stream = stream or sys.stderr
+        formatter = logging.Formatter(FORMAT)
+        for record in list(self.records):
+            stream.write(formatter.format(record) + "\n")
+        stream.flush()
+
+
+def dump(stream=None):
+    if ring is not None:
+        ring.dump(stream)
+
+
+def setup_logging(level=None, period=1.0, ring_size=1000, ring_level=None, log_file=None):
+    # level: None -> from WOLFWAGEN_LOG (info by default)
+    # log_file: write to this file instead of stdout (for the scripts that draw on the terminal with curses)
+    # ring_level: level of the records kept in the ring, None -> from WOLFWAGEN_LOG_RING (same as level by default)
+    global ring
+    setting = os.environ.get("WOLFWAGEN_LOG", "info").lower()
+    if setting in ("0", "off", "false"):
+        logging.disable(logging.CRITICAL)
+        return
+    if level is None:
+        level = logging.DEBUG if setting == "debug" else logging.INFO
+    if ring_level is None:
+        ring_level = logging.DEBUG if os.environ.get("WOLFWAGEN_LOG_RING", "").lower() == "debug" else level
+
+    # the records below the root level are not even created
+    root = logging.getLogger()
+    root.setLevel(min(level, ring_level) if ring_size else level)
+    if ring_size:
+        ring = RingBuffer(ring_size, ring_level)
+        root.addHandler(ring)
+
+    # stdout (or log_file) is written by a listener thread, the loop only puts the record in a queue
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout) if log_file is None else logging.FileHandler(log_file)
+    output.setFormatter(logging.Formatter(FORMAT))
+    to_queue = RateLimitedQueueHandler(records, period)
+    to_queue.setLevel(level)
+    root.addHandler(to_queue)
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    atexit.register(listener.stop)     # write what is still in the queue
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
@@ -0,0 +1,69 @@
+# PID controller of the steering (lane detection node, pid_node), driven by the stamps of the measurements
+# instead of a fixed loop period:
+#
+#   pid = PID(0.15, 0.0, 0.01, output_limits=(-100, 100))
+#   steering = pid.update(error, stamp)     # stamp in seconds (e.g. the header stamp of the camera image)
+#   pid.reset()                             # e.g. after a turn
+#
+# - dt is the time between the stamps of two updates (default_dt for the first one, at most max_dt so that a
+#   pause in the measurements does not blow up the integral)
+# - anti-windup: the integral stays within integral_limits, and does not grow while the output is saturated
+#   in the direction of the error
+# - the derivative is low-pass filtered with time constant derivative_tau (seconds, 0: no filter); it is 0 for
+#   the first update after a reset, so a reset does not kick the output
+# - the output is clamped to output_limits
+
+
+def clamp(value, limits):
+    low, high = limits
+    if low is not None and value < low:
+        return low
+    if high is not None and value > high:
+        return high
+    return value
+
+
+class PID:
+
+    def __init__(self, kp, ki=0.0, kd=0.0, output_limits=(None, None), integral_limits=(None, None),
+                 derivative_tau=0.0, default_dt=0.05, max_dt=0.5):
+        if default_dt <= 0 or max_dt <= 0:
+            raise ValueError("default_dt and max_dt must be positive")
+        if derivative_tau < 0:
+            raise ValueError("derivative_tau must not be negative, got %r" % derivative_tau)
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limits = output_limits
+        self.integral_limits = integral_limits
+        self.derivative_tau = derivative_tau
+        self.default_dt = default_dt
+        self.max_dt = max_dt
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.prev_error = None
+        self.prev_stamp = None
+
+    def update(self, error, stamp=None):
+        dt = self.default_dt
+        if stamp is not None and self.prev_stamp is not None and stamp > self.prev_stamp:
+            dt = min(stamp - self.prev_stamp, self.max_dt)
+        if stamp is not None:
+            self.prev_stamp = stamp
+
+        if self.prev_error is not None:
+            raw = (error - self.prev_error) / dt
+            alpha = dt / (self.derivative_tau + dt)
+            self.derivative += alpha * (raw - self.derivative)
+        self.prev_error = error
+
+        integral = clamp(self.integral + error * dt, self.integral_limits)
+        output = self.kp * error + self.ki * integral + self.kd * self.derivative
+        saturated = clamp(output, self.output_limits)
+        # anti-windup: keep the integral if the output is saturated and the error pushes it further out
+        if saturated == output or (output > saturated) != (error * self.ki > 0):
+            self.integral = integral
+        return saturated
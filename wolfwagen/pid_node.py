@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Image
@@ -7,7 +8,11 @@ import std_msgs.msg as sm
 import cv2 as cv
 import numpy as np
 from cv_bridge import CvBridge
-import threading
+from node_log import setup_logging
+from pid import PID
+from qos import COMMAND
+
+log = logging.getLogger("pid_node")
 
 # sigmoid transform constants
 # > e = EULER
@@ -23,16 +28,15 @@ Kp = 0.2
 Ki = 0
 Kd = 0
 
-# PID frequency
+# expected rate of the lane messages (dt of the first update after a pause, see pid.py)
 FREQ = 20
 
-# delta time
-dt = 1 / float(FREQ)
+# the integral term alone stays within the sigmoid input range (anti-windup, only matters when Ki != 0)
+INTEGRAL_LIMIT = 1000
 
-# callback globals
-err = 0.0
-d_err = 0.0
-i_err = 0.0
+pid = PID(Kp, Ki, Kd, integral_limits=(-INTEGRAL_LIMIT, INTEGRAL_LIMIT), default_dt=1 / float(FREQ))
+publisher = None
+node = None
 
 def sigmoid_normalize(x: float) -> float:
     sigmoid = ((2 * SIGMOID_ASYMPTOTE) / (1 + (EULER ** (-x * SIGMOID_EXP_SCALAR)))) - SIGMOID_ASYMPTOTE
@@ -43,62 +47,52 @@ def lane_callback(msg: sm.Int64) -> None:
     # expect lane to pass error between trajectory center line and lane average center line.
     # > negative if the lane average center line is to the left of the trajectory center line (have to turn left),
     # > positive if to the right (have to turn right)
-    
-    global err , d_err , i_err , dt
-    d_err = (msg.data - err) / dt
-    i_err += msg.data
-    err = msg.data
-    
+    # The steering is published right away (not at the next tick of a fixed-rate loop).
+    # 'lane' is not stamped, so dt is the time between the arrivals of the messages
+
+    stamp = node.get_clock().now().nanoseconds * 1e-9
+    u = pid.update(msg.data, stamp)
+
+    # normalize to smooth values and keep published values in bounds
+    u = sigmoid_normalize(u)
+    log.debug("THIS IS U: %f", u)
+
+    # floor normalized value
+    m = sm.Int64()
+    m.data = int(u)
+
+    # publish
+    publisher.publish(m)
+
 
 def main(args=None) -> None:
 
-    global err , d_err , i_err , dt , Kp , Ki , Kd
+    global publisher , node
+
+    setup_logging()
 
     # initialize node and all related ros2 constructs
     rclpy.init(args=args)
     node = Node("pid_node")
-    
+
+    publisher = node.create_publisher(
+        sm.Int64,
+        "pid_steering",
+        COMMAND
+    )
+
     node.create_subscription(
         sm.Int64,
         "lane",
         lane_callback,
-        10
+        COMMAND
     )
 
-    publisher = node.create_publisher(
-        sm.Int64,
-        "pid_steering",
-        10
-    )
-    
-    thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
-    thread.start()
-    rate = node.create_rate(FREQ, node.get_clock())
-
-    while rclpy.ok():
-        # u = Kp * err + Ki * i_err + Kd * d_err
-        p = Kp * err
-        i = Ki * i_err
-        d = Kd * d_err
-        u = p + i + d
-
-        # normalize to smooth values and keep published values in bounds
-        u = sigmoid_normalize(u)
-        print("THIS IS U: " , u)
-
-        # floor normalized value
-        m = sm.Int64()
-        m.data = int(u)
-
-        # publish
-        publisher.publish(m)
-
-        # maintain rate
-        rate.sleep()
-        
-
-    rclpy.spin(node)
-    rclpy.shutdown()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        pass
+    rclpy.try_shutdown()
 
 
 if __name__ == '__main__':
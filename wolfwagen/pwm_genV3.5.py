@@ -1,26 +1,38 @@
 #!/usr/bin/env python
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Joy
 from std_msgs.msg import String
 from std_msgs.msg import Int64
 from std_msgs.msg import Float64
+from std_msgs.msg import Int64MultiArray
+from diagnostic_msgs.msg import DiagnosticArray
 import struct
 import os
 import threading
 import time
 import curses
-import serial
 import math
 
 #distributed ros doesn't work now, so let's use mqtt for now
 import paho.mqtt.client as paho
+from node_log import setup_logging
+from qos import COMMAND, EVENT
+from latency import FIELDS, TRACE_TOPIC, LatencyTracer, now_ns
+from teensy_link import TeensyLink
 broker_ip="eb2-3254-ub01.csc.ncsu.edu"
 broker_port=12345
 
+log = logging.getLogger("Drive_node")
+
 stdscr = curses.initscr()
 
-teensy = serial.Serial(port = '/dev/ttyACM0' , baudrate = 115200 , timeout = .1)
+#framed commands, written by a separate thread (see teensy_link.py and SerialV1.5.ino)
+teensy = TeensyLink('/dev/ttyACM0' , baudrate = 115200)
+
+#the serial write is not on the control path anymore, so the loop can run faster than 20 Hz
+FREQ = 50
 
 #TODO: pwm should be moved to Teensy microcontroller
 in_min = -100
@@ -44,6 +56,11 @@ auto_throttle = 0	#published (and controller) by xbox_controller
 lidar_min_dist = 1000000	#for LIDAR-based obstacle detection/avoidance
 SAFE_DISTANCE = 0.50	
 
+#camera image -> Teensy latency of the auto steering (see latency.py), on /diagnostics once per second
+tracer = LatencyTracer()
+trace = None	#trace of the last pid_steering command, until it is written to the Teensy
+last_trace_stamp = None
+
 def pwm(val):
 	#TODO: input range check
 	return (val - in_min) * (out_max - out_min) // (in_max - in_min) + out_min
@@ -78,6 +95,15 @@ def pid_steering_callback(data):
 	
 	pid_steer = steer
 
+def trace_callback(data):
+	global trace, last_trace_stamp
+	arrived = now_ns()
+	if data.data[1] == last_trace_stamp:
+		return	#same camera image as the previous command
+	last_trace_stamp = data.data[1]
+	trace = dict(zip(FIELDS, data.data))
+	trace['arrived'] = arrived
+
 def lidar_min_dist_callback(data):
 	global lidar_min_dist
 	lidar_min_dist = data.data	
@@ -122,24 +148,22 @@ def on_voice_cmd_mqtt_message(client, userdata, message):
 	elif cmd == 'start':
 		mode = 1
 	elif cmd == 'left':
-		print('left -- todo')
+		log.info('left -- todo')
 	elif cmd == 'right':
-		print('right -- todo')
+		log.info('right -- todo')
 
-def write_to_teensy(x , y):
-    array = bytearray([x,y])
-    #print(array)
-    teensy.write(array)
-    #print("SENT TO TEENSY")
-    #teensy.write(bytes(y))
-    #time.sleep(0.05)
-    #arduino.write(bytes(y , 'utf-8'))
-    #data = teensy.readline()
-    #return data
+def write_to_teensy(x , y, trace=None):
+    #x: throttle pulse width (us), y: steering angle (degrees)
+    #only hands the command to the writer thread, which sends it when it changes (and as a heartbeat)
+    #trace: latency trace of the command, in teensy.written once the frame was written to the serial port
+    teensy.send(x , y, trace)
 
 
 def main(args=None):
-	print("Driver node")
+	global trace
+	# curses owns the terminal: the log goes to a file (and the ring, see node_log.py)
+	setup_logging(log_file="pwm_genV3.5.log")
+	log.info("Driver node")
 	rclpy.init(args=args)
 	node = Node("Drive_node")
 
@@ -151,21 +175,24 @@ def main(args=None):
 		client.loop_start()
 		client.subscribe("voice_cmd_mqtt")#subscribe
 	except:
-		print("no mqtt")
+		log.warning("no mqtt")
 		pass
 	
-	subscription_manual_steering = node.create_subscription(Int64,'manual_steering', manual_steering_callback, 1)
-	subscription_manual_throttle = node.create_subscription(Int64,'manual_throttle', manual_throttle_callback, 1)
-	subscription_auto_throttle = node.create_subscription(Int64,'auto_throttle', auto_throttle_callback, 1)	
-	subscription_pid_steering = node.create_subscription(Int64 , 'pid_steering' , pid_steering_callback , 1)
-	subscription_mode_switch = node.create_subscription(Int64 , "mode_switch" , mode_switch_callback , 1)	
-	subscription_voice_cmd = node.create_subscription(String , "voice_cmd" , voice_cmd_callback , 1)		
-	subscription_lidar_min_dist = node.create_subscription(Float64 , "lidar_min_dist" , lidar_min_dist_callback , 1)		
-	subscription_stop_sign = node.create_subscription(Int64 , 'stop_sign' , stop_sign_callback , 1)
+	subscription_manual_steering = node.create_subscription(Int64,'manual_steering', manual_steering_callback, COMMAND)
+	subscription_manual_throttle = node.create_subscription(Int64,'manual_throttle', manual_throttle_callback, COMMAND)
+	subscription_auto_throttle = node.create_subscription(Int64,'auto_throttle', auto_throttle_callback, COMMAND)	
+	subscription_pid_steering = node.create_subscription(Int64 , 'pid_steering' , pid_steering_callback , COMMAND)
+	subscription_mode_switch = node.create_subscription(Int64 , "mode_switch" , mode_switch_callback , EVENT)	
+	subscription_voice_cmd = node.create_subscription(String , "voice_cmd" , voice_cmd_callback , EVENT)		
+	subscription_lidar_min_dist = node.create_subscription(Float64 , "lidar_min_dist" , lidar_min_dist_callback , COMMAND)		
+	subscription_stop_sign = node.create_subscription(Int64 , 'stop_sign' , stop_sign_callback , COMMAND)
+	subscription_trace = node.create_subscription(Int64MultiArray , TRACE_TOPIC , trace_callback , COMMAND)
+	diagnostics_publisher = node.create_publisher(DiagnosticArray, '/diagnostics', COMMAND)
+	last_diagnostics_time = time.time()
 	thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
 	thread.start()
 
-	rate = node.create_rate(20, node.get_clock())
+	rate = node.create_rate(FREQ, node.get_clock())
 	
 	while rclpy.ok():
 		
@@ -218,9 +245,16 @@ def main(args=None):
 		stdscr.addstr(2, 5, 'Throttle: %.2f  ' % pwm_throttle)
 		stdscr.addstr(3, 5, 'Steering: %.2f  ' % pwm_steer)
 
-		pwm_throttle = pwm_throttle // 10
-		#print(pwm_throttle)
-		write_to_teensy(pwm_throttle , abs(pwm_steer))
+		#the steering command of the last trace goes with this command (only the auto mode writes pid_steer)
+		traced, trace = trace, None
+		write_to_teensy(pwm_throttle , abs(pwm_steer), traced if mode == 1 else None)
+
+		#traces of the commands the writer thread wrote to the serial port since the last loop
+		while teensy.written:
+			tracer.record(teensy.written.popleft())
+		if tracer.count() > 0 and time.time() - last_diagnostics_time >= 1.0:
+			diagnostics_publisher.publish(tracer.to_diagnostic_array("Drive_node: latency", node.get_clock().now().to_msg()))
+			last_diagnostics_time = time.time()
 		
 		# if safe_distance_violation:
 		# 	stdscr.addstr(4, 5, '-- Safe distance violation (%.2f m)--' % lidar_min_dist)
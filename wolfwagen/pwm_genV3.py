@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Joy
@@ -14,9 +15,13 @@ import curses
 
 #distributed ros doesn't work now, so let's use mqtt for now
 import paho.mqtt.client as paho
+from node_log import setup_logging
+from qos import COMMAND, EVENT
 broker_ip="eb2-3254-ub01.csc.ncsu.edu"
 broker_port=12345
 
+log = logging.getLogger("Drive_node")
+
 stdscr = curses.initscr()
 
 #TODO: pwm should be moved to Teensy microcontroller
@@ -113,13 +118,15 @@ def on_voice_cmd_mqtt_message(client, userdata, message):
 	elif cmd == 'start':
 		mode = 1
 	elif cmd == 'left':
-		print('left -- todo')
+		log.info('left -- todo')
 	elif cmd == 'right':
-		print('right -- todo')
+		log.info('right -- todo')
 
 
 def main(args=None):
-	print("Driver node")
+	# curses owns the terminal: the log goes to a file (and the ring, see node_log.py)
+	setup_logging(log_file="pwm_genV3.log")
+	log.info("Driver node")
 	rclpy.init(args=args)
 	node = Node("Drive_node")
 
@@ -131,25 +138,25 @@ def main(args=None):
 		client.loop_start()
 		client.subscribe("voice_cmd_mqtt")#subscribe
 	except:
-		print("no mqtt")
+		log.warning("no mqtt")
 		pass
 
 
 	try:
 		bus = can.interface.Bus(bustype='socketcan', channel='can0', bitrate=250000)
-		print ("Opened CAN bus")
+		log.info("Opened CAN bus")
 	except IOError:
-		print ("Cannot open CAN bus")
+		log.error("Cannot open CAN bus")
 		return 
 	
-	subscription_manual_steering = node.create_subscription(Int64,'manual_steering', manual_steering_callback, 1)
-	subscription_manual_throttle = node.create_subscription(Int64,'manual_throttle', manual_throttle_callback, 1)
-	subscription_auto_throttle = node.create_subscription(Int64,'auto_throttle', auto_throttle_callback, 1)	
-	subscription_pid_steering = node.create_subscription(Int64 , 'pid_steering' , pid_steering_callback , 1)
-	subscription_mode_switch = node.create_subscription(Int64 , "mode_switch" , mode_switch_callback , 1)	
-	subscription_voice_cmd = node.create_subscription(String , "voice_cmd" , voice_cmd_callback , 1)		
-	subscription_lidar_min_dist = node.create_subscription(Float64 , "lidar_min_dist" , lidar_min_dist_callback , 1)		
-	subscription_stop_sign = node.create_subscription(Int64 , 'stop_sign' , stop_sign_callback , 1)
+	subscription_manual_steering = node.create_subscription(Int64,'manual_steering', manual_steering_callback, COMMAND)
+	subscription_manual_throttle = node.create_subscription(Int64,'manual_throttle', manual_throttle_callback, COMMAND)
+	subscription_auto_throttle = node.create_subscription(Int64,'auto_throttle', auto_throttle_callback, COMMAND)	
+	subscription_pid_steering = node.create_subscription(Int64 , 'pid_steering' , pid_steering_callback , COMMAND)
+	subscription_mode_switch = node.create_subscription(Int64 , "mode_switch" , mode_switch_callback , EVENT)	
+	subscription_voice_cmd = node.create_subscription(String , "voice_cmd" , voice_cmd_callback , EVENT)		
+	subscription_lidar_min_dist = node.create_subscription(Float64 , "lidar_min_dist" , lidar_min_dist_callback , COMMAND)		
+	subscription_stop_sign = node.create_subscription(Int64 , 'stop_sign' , stop_sign_callback , COMMAND)
 	thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
 	thread.start()
 
@@ -0,0 +1,33 @@
+from rclpy.qos import QoSDurabilityPolicy, QoSHistoryPolicy, QoSProfile, QoSReliabilityPolicy
+
+# QoS of the wolfwagen topics (instead of a bare queue depth in every create_subscription / create_publisher).
+#
+# SENSOR:  subscriptions to camera images, pose and LIDAR scans. Only the latest message is ever used, so a
+#          message that is lost or superseded is not retransmitted or queued (best effort, keep last 1).
+#          A best effort subscription gets the messages of reliable publishers too (e.g. the ZED wrapper)
+# COMMAND: steering / throttle / direction values between the nodes: every message is delivered, but only
+#          the latest one is kept (reliable, keep last 1)
+# EVENT:   messages that must not be dropped even when several arrive at once (mode switch, voice commands,
+#          intersection decisions): reliable, keep last 10
+# IMAGE:   images published for rviz2 / webviz (lane_img, sign_img). Reliable, so that the default (reliable)
+#          subscriptions of the viewers match, but only the latest one is kept
+
+SENSOR = QoSProfile(
+    reliability=QoSReliabilityPolicy.BEST_EFFORT,
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=1,
+    durability=QoSDurabilityPolicy.VOLATILE)
+
+COMMAND = QoSProfile(
+    reliability=QoSReliabilityPolicy.RELIABLE,
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=1,
+    durability=QoSDurabilityPolicy.VOLATILE)
+
+EVENT = QoSProfile(
+    reliability=QoSReliabilityPolicy.RELIABLE,
+    history=QoSHistoryPolicy.KEEP_LAST,
+    depth=10,
+    durability=QoSDurabilityPolicy.VOLATILE)
+
+IMAGE = COMMAND
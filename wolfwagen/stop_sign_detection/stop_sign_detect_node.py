@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Image
@@ -11,6 +12,16 @@ import threading
 import time
 import tensorflow as tf
 keras = tf.keras
+import os
+import sys
+# node_log is in the parent directory (wolfwagen/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_hub import SharedFrames, frame_valid
+from image_msg import decode_image
+from node_log import setup_logging
+from qos import SENSOR, COMMAND, IMAGE
+
+log = logging.getLogger("stop_sign_detect_node")
 
 SHOW_IMAGES = False
 
@@ -18,191 +29,224 @@ PI = 3.1415926
 
 bridge = CvBridge()
 
-glob_raw_img = None
-
-def zed_callback(msg: Image):
-    global glob_raw_img
-    glob_raw_img = msg
+CAMERA_TOPIC = '/zed2i/zed_node/rgb_raw/image_raw_color'
 
-def main(args=None) -> None:
+# the model is next to this file (the node can be started from any directory)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stop_sign_model")
 
-    rclpy.init(args=args)
-    node = Node("stop_sign_detect_node")
-    
-    node.create_subscription(
-        Image,
-        '/zed2i/zed_node/rgb_raw/image_raw_color',
-        zed_callback,
-        20
-    )
-
-    publisher = node.create_publisher(
-        Int64,
-        "stop_sign",
-        10
-    )
-
-    sign_img_publisher = node.create_publisher(
-        Image,
-        "sign_img",
-        10
-    )
-
-    model = keras.models.load_model("./stop_sign_model")
-    print("model loaded")
-    thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
-    thread.start()
+class StopSignNode(Node):
+    # frames: FrameHub of the process (see composition.py) when the node shares the camera subscription with the
+    # other nodes of the process, SharedFrames (see frame_hub.py, or -p shared_frames:=true) to read the frames
+    # from the frame hub, None: the node subscribes to the camera topic itself. run() is the main loop
 
-    rate = node.create_rate(10, node.get_clock())
+    def __init__(self, frames=None):
+        super().__init__("stop_sign_detect_node")
+        self.raw_msg = None
 
-    m = Int64()
-    print("starting...")
-    while rclpy.ok():
+        if frames is None and self.declare_parameter('shared_frames', False).value:
+            frames = SharedFrames(self)
+        if frames is not None:
+            frames.subscribe(CAMERA_TOPIC, self.zed_callback)
+        else:
+            self.create_subscription(Image, CAMERA_TOPIC, self.zed_callback, SENSOR)
 
-        
+        self.publisher = self.create_publisher(
+            Int64,
+            "stop_sign",
+            COMMAND
+        )
 
-        if glob_raw_img == None:
-            print("no image")
-            rate.sleep()
-            continue
+        self.sign_img_publisher = self.create_publisher(
+            Image,
+            "sign_img",
+            IMAGE
+        )
 
-        loop_start_time = time.time()
+        self.model = keras.models.load_model(MODEL_PATH)
+        log.info("model loaded")
 
-        # cache and convert the raw image to openCV format
-        raw_img = bridge.imgmsg_to_cv2(glob_raw_img)
-        if SHOW_IMAGES:
-            cv.imshow("initial", raw_img)
-            cv.waitKey(1)
+    # only store the message here, it is decoded in the main loop (see decode_image)
+    def zed_callback(self, msg: Image):
+        self.raw_msg = msg
 
-        # apply transformations to make it easier to preprocess
-        median_blur_img = cv.medianBlur(raw_img, 7)
-        hsv_img = cv.cvtColor(median_blur_img, cv.COLOR_BGR2HSV)
+    def run(self) -> None:
+        rate = self.create_rate(10, self.get_clock())
 
-        # obtain red color mask
-        red_mask = cv.bitwise_or(
-            cv.inRange(hsv_img, (0, 50, 100), (10, 255, 255)),
-            cv.inRange(hsv_img, (160, 100, 100), (180, 255, 255))
-        )
+        m = Int64()
+        last_raw_img = None
+        log.info("starting...")
+        while rclpy.ok():
 
-        # mask the raw image with the red mask to set all non-red values to zero
-        masked_img = cv.cvtColor(cv.bitwise_and(median_blur_img, median_blur_img, mask=red_mask), cv.COLOR_BGR2GRAY)
-
-        # grab circles from grayscale image
-        circles = cv.HoughCircles(
-            image=masked_img,
-            method=cv.HOUGH_GRADIENT,
-            dp=1,
-            minDist=len(masked_img) // 5,
-            param1=200,
-            param2=20,
-            minRadius=len(masked_img) // 20,
-            maxRadius=len(masked_img) // 4
-        )
+            if self.raw_msg is None:
+                log.info("no image")
+                rate.sleep()
+                continue
 
-        best = [0, 0, 0]
+            # same message as the last loop, nothing new to detect
+            if self.raw_msg is last_raw_img:
+                rate.sleep()
+                continue
 
-        # if there are no circles, publish a value of zero
-        if circles is None:
-            print("none")
-            m.data = 0
-        else:
+            loop_start_time = time.time()
 
+            # cache and view the raw image in openCV format
+            last_raw_img = self.raw_msg
+            raw_img = decode_image(last_raw_img)
+            if raw_img is None:
+                # the frame hub restarted, its frame ring is gone
+                rate.sleep()
+                continue
             if SHOW_IMAGES:
-                cv.imshow("red", masked_img)
+                cv.imshow("initial", raw_img)
                 cv.waitKey(1)
 
-            # find the circle with the largest percent area of non-zero values
-            # based on the red-masked image
-            best_num = 0
-            empty_mask = np.zeros_like(masked_img)
-            for circle in circles[0,:]:
-                cv.circle(
-                    img=empty_mask,
-                    center=(int(circle[0]), int(circle[1])),
-                    radius=int(circle[2]),
-                    color=(255, 255, 255),
-                    thickness=-1
-                )
-                double_masked_img = cv.bitwise_and(masked_img, empty_mask)
+            # apply transformations to make it easier to preprocess
+            median_blur_img = cv.medianBlur(raw_img, 7)
+            hsv_img = cv.cvtColor(median_blur_img, cv.COLOR_BGR2HSV)
+
+            # obtain red color mask
+            red_mask = cv.bitwise_or(
+                cv.inRange(hsv_img, (0, 50, 100), (10, 255, 255)),
+                cv.inRange(hsv_img, (160, 100, 100), (180, 255, 255))
+            )
+
+            # mask the raw image with the red mask to set all non-red values to zero
+            masked_img = cv.cvtColor(cv.bitwise_and(median_blur_img, median_blur_img, mask=red_mask), cv.COLOR_BGR2GRAY)
+
+            # grab circles from grayscale image
+            circles = cv.HoughCircles(
+                image=masked_img,
+                method=cv.HOUGH_GRADIENT,
+                dp=1,
+                minDist=len(masked_img) // 5,
+                param1=200,
+                param2=20,
+                minRadius=len(masked_img) // 20,
+                maxRadius=len(masked_img) // 4
+            )
+
+            best = [0, 0, 0]
+
+            # if there are no circles, publish a value of zero
+            if circles is None:
+                log.debug("none")
+                m.data = 0
+            else:
+
+                if SHOW_IMAGES:
+                    cv.imshow("red", masked_img)
+                    cv.waitKey(1)
+
+                # find the circle with the largest percent area of non-zero values
+                # based on the red-masked image
+                best_num = 0
+                empty_mask = np.zeros_like(masked_img)
+                for circle in circles[0,:]:
+                    cv.circle(
+                        img=empty_mask,
+                        center=(int(circle[0]), int(circle[1])),
+                        radius=int(circle[2]),
+                        color=(255, 255, 255),
+                        thickness=-1
+                    )
+                    double_masked_img = cv.bitwise_and(masked_img, empty_mask)
                 
-                percent_area = cv.countNonZero(double_masked_img) / (PI * (circle[2] ** 2))
-                if percent_area > best_num:
-                    best = circle
-                    best_num = percent_area
+                    percent_area = cv.countNonZero(double_masked_img) / (PI * (circle[2] ** 2))
+                    if percent_area > best_num:
+                        best = circle
+                        best_num = percent_area
 
-            if SHOW_IMAGES:
-                cv.imshow("circles", empty_mask)
-                cv.waitKey(1)
+                if SHOW_IMAGES:
+                    cv.imshow("circles", empty_mask)
+                    cv.waitKey(1)
 
-            # crop the image to the detected potential stop sign
-            img_y, img_x, chan = raw_img.shape
-            buffer = best[2] * 1.5
+                # crop the image to the detected potential stop sign
+                img_y, img_x, chan = raw_img.shape
+                buffer = best[2] * 1.5
 
-            crop_x1 = max(int(best[0] - buffer), 0)
-            crop_x2 = min(int(best[0] + buffer), img_x)
-            crop_y1 = max(int(best[1] - buffer), 0)
-            crop_y2 = min(int(best[1] + buffer), img_y)
+                crop_x1 = max(int(best[0] - buffer), 0)
+                crop_x2 = min(int(best[0] + buffer), img_x)
+                crop_y1 = max(int(best[1] - buffer), 0)
+                crop_y2 = min(int(best[1] + buffer), img_y)
 
-            cropped_img = raw_img[crop_y1:crop_y2, crop_x1:crop_x2]
+                cropped_img = raw_img[crop_y1:crop_y2, crop_x1:crop_x2]
 
-            if SHOW_IMAGES:
-                cv.imshow("cropped", cropped_img)
-                cv.waitKey(1)
+                if SHOW_IMAGES:
+                    cv.imshow("cropped", cropped_img)
+                    cv.waitKey(1)
 
-            # resize the image to the size needed by the model
-            resized_img = cv.resize(cropped_img, (128, 128))
+                # resize the image to the size needed by the model
+                resized_img = cv.resize(cropped_img, (128, 128))
 
-            if SHOW_IMAGES:
-                cv.imshow("resized", resized_img)
-                cv.waitKey(1)
+                if SHOW_IMAGES:
+                    cv.imshow("resized", resized_img)
+                    cv.waitKey(1)
 
-            # format with batch_size dimension
-            input_img = np.array([cv.cvtColor(resized_img, cv.COLOR_BGR2RGB)])
+                # format with batch_size dimension
+                input_img = np.array([cv.cvtColor(resized_img, cv.COLOR_BGR2RGB)])
 
-            # get the model prediction
-            classification = model(input_img).numpy().argmax()
+                # get the model prediction
+                classification = self.model(input_img).numpy().argmax()
         
-            # determine if stop sign was classified
-            if classification == 14:
-                m.data = 1
-            else:
-                m.data = 0
+                # determine if stop sign was classified
+                if classification == 14:
+                    m.data = 1
+                else:
+                    m.data = 0
         
-        # publish
-        # print(m)
-        # publisher.publish(m)
-        if m.data == 1:
-            print("stop sign detected")
-        else:
-            print("no")
+            # Sign img for viz
+            mask = np.zeros_like(raw_img)
+            color = (0, 255, 0) if m.data == 1 else (0, 255, 255)
+            thickness = -1 if m.data == 1 else 15
+            cv.circle(
+                img=mask,
+                center=(int(best[0]), int(best[1])),
+                radius=int(best[2]),
+                color=color,
+                thickness=thickness
+            )
+            final_image = cv.addWeighted(raw_img, 0.8, mask, 0.2, gamma=0)
+
+            # the pixels are not used after this point
+            if not frame_valid(last_raw_img):
+                log.debug("frame overwritten in the frame ring while it was processed, dropped")
+                rate.sleep()
+                continue
+
+            # publish
+            # print(m)
+            # publisher.publish(m)
+            if m.data == 1:
+                log.info("stop sign detected")
+            else:
+                log.debug("no")
         
-        publisher.publish(m)
-
-        # Sign img for viz
-        mask = np.zeros_like(raw_img)
-        color = (0, 255, 0) if m.data == 1 else (0, 255, 255)
-        thickness = -1 if m.data == 1 else 15
-        cv.circle(
-            img=mask,
-            center=(int(best[0]), int(best[1])),
-            radius=int(best[2]),
-            color=color,
-            thickness=thickness
-        )
-        final_image = cv.addWeighted(raw_img, 0.8, mask, 0.2, gamma=0)
-        H, W, _ = final_image.shape
-        smaller_dim = (int(W*0.2), int(H*0.2))
-        final_image = cv.resize(final_image, smaller_dim)
-        img_msg = bridge.cv2_to_imgmsg(final_image, encoding="bgra8")
-        sign_img_publisher.publish(img_msg)
+            self.publisher.publish(m)
+
+            H, W, _ = final_image.shape
+            smaller_dim = (int(W*0.2), int(H*0.2))
+            final_image = cv.resize(final_image, smaller_dim)
+            img_msg = bridge.cv2_to_imgmsg(final_image, encoding="bgra8")
+            self.sign_img_publisher.publish(img_msg)
+
+            #loop_end_time = time.time()
+            #print("loop_time", (loop_end_time-loop_start_time))
 
-        #loop_end_time = time.time()
-        #print("loop_time", (loop_end_time-loop_start_time))
 
+            # maintain rate
+            rate.sleep()
+
+def main(args=None) -> None:
+
+    setup_logging()
+    rclpy.init(args=args)
+    node = StopSignNode()
+
+    thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
+    thread.start()
+
+    node.run()
 
-        # maintain rate
-        rate.sleep()
-    
     rclpy.shutdown()
 
 
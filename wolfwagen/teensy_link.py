@@ -0,0 +1,136 @@
+import logging
+import struct
+import threading
+import time
+from collections import deque
+
+# Serial link to the Teensy (SerialV1.5.ino): throttle and steering in framed, checksummed packets, written by a
+# separate thread so that the control loop never waits for the serial port.
+#
+#   teensy = TeensyLink('/dev/ttyACM0')
+#   teensy.send(throttle_us, steering_deg)    # returns right away, only the latest value is kept
+#   teensy.send(throttle_us, steering_deg, trace)
+#   teensy.written.popleft()                  # the trace, with 'written' set once the frame went to the port
+#
+# Frame (7 bytes):
+#   0xA5 0x5A   sync
+#   seq         uint8, +1 per frame (the Teensy counts the frames it missed)
+#   throttle    uint16 little endian, ESC pulse width in microseconds
+#   steering    uint8, servo angle in degrees (0..180)
+#   crc         CRC-8 (polynomial 0x07, initial value 0) of seq, throttle and steering
+# A corrupted or incomplete frame is dropped, and the Teensy looks for the next sync bytes, so a lost byte costs
+# one command instead of swapping throttle and steering from then on.
+#
+# A frame is written when the command changes, and at least every 'heartbeat' seconds otherwise. The Teensy
+# sets the throttle to neutral when it gets no valid frame for FAILSAFE_TIMEOUT ms (see SerialV1.5.ino).
+#
+# trace (latency.py): dict of the command, 'written' is set (time.time_ns(), the clock of latency.now_ns) after
+# the frame of the command was written to the port, and the trace is appended to 'written'. The trace of a command
+# that is not written (unchanged, or replaced by a newer one before the writer got to it) is dropped.
+
+log = logging.getLogger("teensy_link")
+
+SYNC = b"\xA5\x5A"
+PAYLOAD = struct.Struct("<BHB")     # seq, throttle, steering
+
+HEARTBEAT = 0.1     # seconds
+
+
+def _crc8_table(poly=0x07):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(seq, throttle, steering):
+    if not 0 <= throttle <= 0xFFFF or not 0 <= steering <= 180:
+        raise ValueError("throttle %r / steering %r out of range" % (throttle, steering))
+    payload = PAYLOAD.pack(seq & 0xFF, int(throttle), int(steering))
+    return SYNC + payload + bytes((crc8(payload),))
+
+
+def decode_frame(frame):
+    # (seq, throttle, steering) of a frame, None if it is not a valid one
+    if len(frame) != len(SYNC) + PAYLOAD.size + 1 or frame[:len(SYNC)] != SYNC:
+        return None
+    payload = frame[len(SYNC):-1]
+    if crc8(payload) != frame[-1]:
+        return None
+    return PAYLOAD.unpack(payload)
+
+
+class TeensyLink:
+    # port: serial port name, or an open serial.Serial (anything with write())
+
+    def __init__(self, port, baudrate=115200, heartbeat=HEARTBEAT):
+        if isinstance(port, str):
+            import serial
+            port = serial.Serial(port=port, baudrate=baudrate, timeout=.1, write_timeout=.1)
+        self.port = port
+        self.heartbeat = heartbeat
+        self.seq = 0
+        self.frames = 0         # frames written
+        self.errors = 0         # failed writes
+        self.command = None     # latest (throttle, steering), written by the thread
+        self.trace = None       # trace of the command, until the thread takes it
+        self.written = deque(maxlen=100)    # traces of the written commands
+        self.changed = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="teensy_writer", daemon=True)
+        self.thread.start()
+
+    def send(self, throttle, steering, trace=None):
+        with self.changed:
+            if (throttle, steering) != self.command:
+                self.command = (throttle, steering)
+                self.trace = trace
+                self.changed.notify()
+
+    def run(self):
+        sent = None
+        last_write = 0.0
+        while self.running:
+            with self.changed:
+                if self.command is None:
+                    self.changed.wait()
+                elif self.command == sent:
+                    self.changed.wait(max(0.0, last_write + self.heartbeat - time.monotonic()))
+                command = self.command
+                trace, self.trace = self.trace, None
+            if command is None or not self.running:
+                continue
+            if command == sent and time.monotonic() - last_write < self.heartbeat:
+                continue
+
+            self.seq = (self.seq + 1) & 0xFF
+            try:
+                self.port.write(encode_frame(self.seq, *command))
+                self.frames += 1
+                if trace is not None:
+                    trace['written'] = time.time_ns()
+                    self.written.append(trace)
+            except Exception as e:  # serial.SerialException, SerialTimeoutException, OSError
+                self.errors += 1
+                log.error("write to the Teensy failed: %s", e)
+            sent = command
+            last_write = time.monotonic()
+
+    def close(self):
+        self.running = False
+        with self.changed:
+            self.changed.notify()
+        self.thread.join(1.0)
@@ -0,0 +1,79 @@
+# The whole wolfwagen stack (what cmd_list used to start in separate terminals):
+#
+#   ros2 launch ./wolfwagen.launch.py
+#   ros2 launch ./wolfwagen.launch.py profile:=V7 lidar:=false
+#   ros2 launch ./wolfwagen.launch.py driver:=false      # run ./pwm_genV3.py in its own terminal instead
+#
+# - ZED 2i camera, joystick, LIDAR and rosbridge (their own packages)
+# - composition.py: lane detection, stop sign detection, obstacle detector and xbox controller in one process
+# - the driver (pwm_genV3.py by default): a separate process, it opens the serial port and draws with curses
+#
+# The nodes of composition.py already share the camera images in-process, so the frame hub (frame_hub.py) is not
+# part of the launch. Start it on its own for camera nodes that run in other processes (e.g. the ml_lane dataset
+# generators with -p shared_frames:=true).
+
+import os
+
+from ament_index_python.packages import get_package_share_directory
+from launch import LaunchDescription
+from launch.actions import DeclareLaunchArgument, ExecuteProcess, IncludeLaunchDescription
+from launch.conditions import IfCondition
+from launch.launch_description_sources import AnyLaunchDescriptionSource, PythonLaunchDescriptionSource
+from launch.substitutions import LaunchConfiguration
+from launch_ros.actions import Node
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def generate_launch_description():
+    profile = LaunchConfiguration('profile')
+    driver_script = LaunchConfiguration('driver_script')
+
+    camera = IncludeLaunchDescription(
+        PythonLaunchDescriptionSource(
+            os.path.join(get_package_share_directory('zed_wrapper'), 'launch', 'zed2i.launch.py')),
+        condition=IfCondition(LaunchConfiguration('camera')))
+
+    joy = Node(
+        package='joy',
+        executable='joy_node',
+        parameters=[{'autorepeat_rate': 0.0}])
+
+    lidar = IncludeLaunchDescription(
+        PythonLaunchDescriptionSource(
+            os.path.join(get_package_share_directory('sllidar_ros2'), 'launch', 'sllidar_s2_launch.py')),
+        condition=IfCondition(LaunchConfiguration('lidar')))
+
+    rosbridge = IncludeLaunchDescription(
+        AnyLaunchDescriptionSource(
+            os.path.join(get_package_share_directory('rosbridge_server'), 'launch', 'rosbridge_websocket_launch.xml')),
+        condition=IfCondition(LaunchConfiguration('rosbridge')))
+
+    nodes = ExecuteProcess(
+        cmd=['python3', 'composition.py', '--profile', profile],
+        cwd=HERE,
+        output='screen',
+        emulate_tty=True)
+
+    driver = ExecuteProcess(
+        cmd=['python3', driver_script],
+        cwd=HERE,
+        output='screen',
+        emulate_tty=True,
+        condition=IfCondition(LaunchConfiguration('driver')))
+
+    return LaunchDescription([
+        DeclareLaunchArgument('profile', default_value='V6', description='lane detection profile'),
+        DeclareLaunchArgument('camera', default_value='true', description='start the ZED wrapper'),
+        DeclareLaunchArgument('lidar', default_value='true', description='start the LIDAR driver'),
+        DeclareLaunchArgument('rosbridge', default_value='true', description='start the rosbridge websocket'),
+        DeclareLaunchArgument('driver', default_value='true', description='start the driver script'),
+        DeclareLaunchArgument('driver_script', default_value='pwm_genV3.py',
+                              description='driver script (pwm_genV3.py, pwm_genV3.5.py)'),
+        camera,
+        joy,
+        lidar,
+        rosbridge,
+        nodes,
+        driver,
+    ])
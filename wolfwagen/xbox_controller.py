@@ -1,22 +1,21 @@
 #!/usr/bin/env python
+import logging
 import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Joy
 from std_msgs.msg import Int64
 import threading
+from node_log import setup_logging
+from qos import COMMAND, EVENT
 
 #Joy node should be running  
 #ros2 run joy joy_node --ros-args -p autorepeat_rate:=0.0
 
-steering = 0
-throttle = 0
-auto_throttle = 24	#in auto mode
+log = logging.getLogger("xbox_controller_node")
 
 MAX_MANUAL_THROTTLE = 28
 MAX_AUTO_THROTTLE = 28
 
-mode_switch_requested = 0
-
 axis_throttle = 1
 axis_steering = 2
 axis_mode = 0
@@ -27,77 +26,83 @@ topic_auto_throttle = "auto_throttle"
 topic_mode_switch = "mode_switch"
 
 
+class XboxControllerNode(Node):
+	# Joystick -> manual steering/throttle, auto throttle and mode switch requests. run() is the main loop
+
+	def __init__(self):
+		super().__init__("xbox_controller_node")
+		self.steering = 0
+		self.throttle = 0
+		self.auto_throttle = 24	#in auto mode
+		self.mode_switch_requested = 0
+
+		self.create_subscription(Joy, 'joy', self.joy_callback, EVENT)
+
+		self.pub_manual_steering = self.create_publisher(Int64, topic_manual_steering, COMMAND)
+		self.pub_manual_throttle = self.create_publisher(Int64, topic_manual_throttle, COMMAND)
+		self.pub_auto_throttle = self.create_publisher(Int64, topic_auto_throttle, COMMAND)
+		self.pub_mode_switch = self.create_publisher(Int64 , topic_mode_switch , EVENT)
+
+	def joy_callback(self, data):
+		self.throttle = int(data.axes[axis_throttle]*100)
+		if self.throttle>MAX_MANUAL_THROTTLE:
+		    self.throttle = MAX_MANUAL_THROTTLE
+		elif self.throttle<-MAX_MANUAL_THROTTLE:
+			self.throttle = -MAX_MANUAL_THROTTLE
+
+		# LB/RB to decrease/increase auto throttle (=fixed throttle when the car in the auto mode) 
+		# just publish auto_throttle from here. Driver (pwm_gen) will use it. 
+		if data.buttons[4]:
+			self.auto_throttle -= 1
+		if data.buttons[5]:
+			self.auto_throttle += 1
+		if self.auto_throttle > MAX_AUTO_THROTTLE:
+		    self.auto_throttle = MAX_AUTO_THROTTLE
+		elif self.auto_throttle < -MAX_AUTO_THROTTLE:
+			self.auto_throttle = -MAX_AUTO_THROTTLE
+
+		self.steering = int(-data.axes[axis_steering]*100)
+	
+		# Let the mode switch happen in the driver, not here
+		if data.buttons[axis_mode]:
+			self.mode_switch_requested = 1
 
-def joy_callback(data):
-	global steering, throttle, auto_throttle, mode_switch_requested
+	def run(self):
+		rate = self.create_rate(20, self.get_clock())
 
-	throttle = int(data.axes[axis_throttle]*100)
-	if throttle>MAX_MANUAL_THROTTLE:
-	    throttle = MAX_MANUAL_THROTTLE
-	elif throttle<-MAX_MANUAL_THROTTLE:
-		throttle = -MAX_MANUAL_THROTTLE
+		while rclpy.ok():
+			m = Int64()
+			m.data = self.steering
+			self.pub_manual_steering.publish(m)
 
-	# LB/RB to decrease/increase auto throttle (=fixed throttle when the car in the auto mode) 
-	# just publish auto_throttle from here. Driver (pwm_gen) will use it. 
-	if data.buttons[4]:
-		auto_throttle -= 1
-	if data.buttons[5]:
-		auto_throttle += 1
-	if auto_throttle > MAX_AUTO_THROTTLE:
-	    auto_throttle = MAX_AUTO_THROTTLE
-	elif auto_throttle < -MAX_AUTO_THROTTLE:
-		auto_throttle = -MAX_AUTO_THROTTLE
+			m.data = self.throttle
+			self.pub_manual_throttle.publish(m)
 
+			m.data = self.auto_throttle
+			self.pub_auto_throttle.publish(m)
+		
+			# instead of keeping track of the mode here, just let the driver know that there is a mode-switch request
+			if self.mode_switch_requested:
+				m.data = 1
+				self.pub_mode_switch.publish(m)
+				self.mode_switch_requested = 0
 
-	steering = int(-data.axes[axis_steering]*100)
-	
-	# Let the mode switch happen in the driver, not here
-	if data.buttons[axis_mode]:
-		mode_switch_requested = 1
-		 
-	
+			log.debug("manual throttle: %d (auto: %d), manual steering: %d", self.throttle, self.auto_throttle, self.steering)
+		
+			rate.sleep()
 
 				
 def main(args=None):
-	global mode_switch_requested
-
-	print("xbox_controller")
+	setup_logging()
+	log.info("xbox_controller")
 	rclpy.init(args=args)
-	node = Node("xbox_controller_node")
-	node.create_subscription(Joy, 'joy', joy_callback, 1)
-	
-	pub_manual_steering = node.create_publisher(Int64, topic_manual_steering, 1)
-	pub_manual_throttle = node.create_publisher(Int64, topic_manual_throttle, 1)
-	pub_auto_throttle = node.create_publisher(Int64, topic_auto_throttle, 1)
-	pub_mode_switch = node.create_publisher(Int64 , topic_mode_switch , 1)
+	node = XboxControllerNode()
 	
 	thread = threading.Thread(target=rclpy.spin, args=(node, ), daemon=True)
 	thread.start()
 
-	rate = node.create_rate(20, node.get_clock())
-
-	while rclpy.ok():
-		m = Int64()
-		m.data = steering
-		pub_manual_steering.publish(m)
-
-		m.data = throttle
-		pub_manual_throttle.publish(m)
-
-		m.data = auto_throttle
-		pub_auto_throttle.publish(m)
-		
-		# instead of keeping track of the mode here, just let the driver know that there is a mode-switch request
-		if mode_switch_requested:
-			m.data = 1
-			pub_mode_switch.publish(m)
-			mode_switch_requested = 0
-
-		print("manual throttle: %d (auto: %d), manual steering: %d" % (throttle, auto_throttle, steering))
-		
-		rate.sleep()
+	node.run()
 
-	rclpy.spin(node)
 	rclpy.shutdown()
 
 if __name__ == '__main__':